@@ -0,0 +1,40 @@
+class AnimationStrip:
+    """
+    A particle's appearance over its lifetime, rendered ahead of time as a strip of frames.
+    Each variant is a separate strip, such as the sprite starting at a different rotation.
+    Frames that haven't been baked yet are rendered the first time they're looked up.
+    """
+
+    def __init__(self, render, frames, variants=1):
+        """
+        :param render: Called with (variant, through) to render one frame, where through goes from 0 to 1
+        :param frames: How many frames to split the lifetime into
+        :param variants: How many versions of the strip there are
+        """
+        self.render = render
+        self.frames = frames
+        self.variants = variants
+        self.surfaces = [[None] * frames for _ in range(variants)]
+
+    def bake(self):
+        """
+        Renders every frame that hasn't been rendered yet.
+        """
+        for variant in range(self.variants):
+            for frame in range(self.frames):
+                self.frame(variant, frame)
+
+    def frame(self, variant, frame):
+        surfaces = self.surfaces[variant]
+        if surfaces[frame] is None:
+            surfaces[frame] = self.render(variant, frame/self.frames)
+        return surfaces[frame]
+
+    def surface(self, variant, through):
+        """
+        :param variant: Which variant to use, wrapping around
+        :param through: How far through its lifetime the particle is, from 0 to 1
+        :return: The frame to draw
+        """
+        frame = min(max(int(through * self.frames), 0), self.frames - 1)
+        return self.frame(int(variant) % self.variants, frame)
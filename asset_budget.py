@@ -0,0 +1,121 @@
+import collections
+
+
+class AssetBudget:
+    """
+    Least recently used bookkeeping for one of the static asset managers. It tracks how big each cached entry is
+    and which ones are pinned, and picks the entries to forget to stay under a memory budget.
+    Entries are keyed however the manager likes, but each belongs to a path, which is what gets pinned.
+    Charged entries belong to no path, so they're never pinned.
+    """
+
+    def __init__(self, max_bytes):
+        """
+        :param max_bytes: The most bytes of entries to keep, or None for no limit
+        """
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.pinned = set()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_times = {}
+
+    def hit(self, key):
+        """
+        Marks an entry as just used.
+        """
+        self.entries.move_to_end(key)
+        self.hits += 1
+
+    def add(self, key, path, size, seconds):
+        """
+        Records a new entry.
+        :param key: How the manager finds the entry
+        :param path: The file it came from
+        :param size: Roughly how many bytes it takes up
+        :param seconds: How long it took to load
+        """
+        self.misses += 1
+        self.entries[key] = path, size
+        self.bytes += size
+        self.load_times[path] = self.load_times.get(path, 0) + seconds
+
+    def charge(self, key, size):
+        """
+        Records an entry that isn't a loaded asset, like a cached transform of one. It counts toward the budget
+        and is evicted like anything else, but isn't counted as a load and can't be pinned.
+        """
+        self.entries[key] = None, size
+        self.bytes += size
+
+    def touch(self, key):
+        """
+        Marks a charged entry as just used.
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+
+    def resize(self, key, size):
+        """
+        Updates the size of an entry that was replaced in place.
+        """
+        path, old_size = self.entries[key]
+        self.entries[key] = path, size
+        self.bytes += size - old_size
+
+    def remove(self, key):
+        if key in self.entries:
+            _, size = self.entries.pop(key)
+            self.bytes -= size
+
+    def evict(self):
+        """
+        Picks the least recently used unpinned entries, until the rest fit in the budget or only pinned ones are left.
+        :return: The keys of the evicted entries, which the manager should forget
+        """
+        if self.max_bytes is None or self.bytes <= self.max_bytes:
+            return []
+        evicted = []
+        for key, (path, size) in list(self.entries.items()):
+            if self.bytes <= self.max_bytes:
+                break
+            if path in self.pinned:
+                continue
+            self.remove(key)
+            self.evictions += 1
+            evicted.append(key)
+        return evicted
+
+    def pin(self, path):
+        self.pinned.add(path)
+
+    def unpin(self, path):
+        self.pinned.discard(path)
+
+    def clear(self):
+        """
+        Forgets every entry, keeping the pins and the counters.
+        """
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self):
+        """
+        :return: Hits, misses, evictions, resident entries and bytes, and seconds spent loading each path.
+            Entries and bytes include charged ones, which are also broken out on their own.
+        """
+        charged = [size for path, size in self.entries.values() if path is None]
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "charged_entries": len(charged),
+            "charged_bytes": sum(charged),
+            "budget": self.max_bytes,
+            "pinned": len(self.pinned),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "load_times": dict(self.load_times),
+        }
@@ -0,0 +1,76 @@
+import pygame
+
+import constants as c
+from image_manager import ImageManager
+
+
+class ScrollingBackdrop:
+    """
+    The scrolling wallpaper of flavor icons behind the menus. The pattern repeats every six rows, so it's
+    rendered once into a screen-wide strip that tall and scrolled with a few opaque blits per frame.
+    """
+
+    COLOR = (0, 60, 80)
+    TILE_WIDTH = 160
+    TILE_HEIGHT = TILE_WIDTH//3
+    ROWS = 6
+    SPEED = (20, 10)
+
+    STRIP = None
+
+    def __init__(self):
+        self.age = 0
+        if not ScrollingBackdrop.STRIP:
+            ScrollingBackdrop.STRIP = self.render_strip()
+
+    @staticmethod
+    def render_tile():
+        shadows = [
+            ImageManager.load_scaled("assets/images/spicy_shadow.png", (32, 32)),
+            ImageManager.load_scaled("assets/images/savory_shadow.png", (32, 32)),
+            ImageManager.load_scaled("assets/images/sweet_shadow.png", (32, 32)),
+        ]
+
+        width = ScrollingBackdrop.TILE_WIDTH
+        height = ScrollingBackdrop.TILE_HEIGHT
+        tile = pygame.Surface((width, height))
+        tile.fill((255, 0, 255))
+        tile.set_colorkey((255, 0, 255), pygame.RLEACCEL)
+        x = width//6
+        for item in shadows:
+            xf = x - item.get_width()//2
+            yf = height//2 - item.get_height()//2
+            tile.blit(item, (xf, yf))
+            x += width//3
+        tile.set_alpha(50)
+        return tile
+
+    @staticmethod
+    def render_strip():
+        tile = ScrollingBackdrop.render_tile()
+        width = ScrollingBackdrop.TILE_WIDTH
+        height = ScrollingBackdrop.TILE_HEIGHT
+
+        # One tile wider than the screen, so it can scroll a whole tile sideways
+        strip = pygame.Surface((c.WINDOW_WIDTH + width, height * ScrollingBackdrop.ROWS))
+        strip.fill(ScrollingBackdrop.COLOR)
+        for row in range(ScrollingBackdrop.ROWS):
+            # Each row is shifted a sixth of a tile further than the last
+            x = round((row + 2) * width/ScrollingBackdrop.ROWS) % width - width
+            while x < strip.get_width():
+                strip.blit(tile, (x, row * height))
+                x += width
+        if pygame.display.get_surface():
+            strip = strip.convert()
+        return strip
+
+    def update(self, dt, events):
+        self.age += dt
+
+    def draw(self, surface, offset=(0, 0)):
+        strip = ScrollingBackdrop.STRIP
+        x = -self.TILE_WIDTH + (self.age * self.SPEED[0]) % self.TILE_WIDTH + offset[0]
+        y = -strip.get_height() + (self.age * self.SPEED[1]) % strip.get_height() + offset[1]
+        while y < c.WINDOW_HEIGHT:
+            surface.blit(strip, (x, y))
+            y += strip.get_height()
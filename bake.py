@@ -0,0 +1,132 @@
+import argparse
+import ast
+import operator
+import os
+
+import yaml
+
+import constants as c
+
+
+OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+}
+NAMES = ("width", "height", "window_width", "window_height")
+
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def evaluate(expression, names):
+    """
+    :param expression: A number, or an expression in the names, from bake.yaml. Only numbers, the names,
+        + - * / //, unary minus and parentheses are allowed.
+    :return: Its value
+    """
+    if type(expression) in (int, float):
+        return expression
+    try:
+        tree = ast.parse(str(expression), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Can't parse size {expression!r}") from e
+    return evaluate_node(tree.body, names, expression)
+
+
+def evaluate_node(node, names, expression):
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.Name) and node.id in NAMES:
+        return names[node.id]
+    if isinstance(node, ast.BinOp) and type(node.op) in OPERATORS:
+        return OPERATORS[type(node.op)](evaluate_node(node.left, names, expression), evaluate_node(node.right, names, expression))
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return -evaluate_node(node.operand, names, expression)
+    raise ValueError(f"{ast.unparse(node)!r} isn't allowed in size {expression!r}")
+
+
+def entries(config):
+    """
+    :return: (image path, size expressions) for every image in bake.yaml, in order
+    """
+    for entry in config:
+        for path in entry.get("images", [entry.get("image")]):
+            yield path, entry["sizes"]
+
+
+def bake(config_path, size):
+    """
+    Scales every image in the config for a window size, using the same ImageManager code the game does,
+    and writes the results and an index to ImageManager's baked directory for that size.
+    :param config_path: The path of bake.yaml
+    :param size: The (width, height) of the window to bake for
+    :return: The directory written to
+    """
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    import pygame
+    from image_manager import ImageManager
+
+    pygame.init()
+    pygame.display.set_mode(size)
+    ImageManager.init()
+    # Always bake from the original images
+    ImageManager.baked = {}
+
+    with open(config_path) as f:
+        config = yaml.safe_load(f.read())
+
+    directory = ImageManager.baked_directory(size)
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(".png") or name == "index.yaml":
+            os.remove(os.path.join(directory, name))
+
+    index = {}
+    for path, sizes in entries(config):
+        source = ImageManager.load(path)
+        width, height = source.get_size()
+        names = {"width": width, "height": height, "window_width": size[0], "window_height": size[1]}
+        entry = index.setdefault(path, {"size": [width, height], "source": ImageManager.source_stamp(path), "variants": []})
+        stem = os.path.splitext(os.path.basename(path))[0]
+        for expressions in sizes:
+            scaled = int(evaluate(expressions[0], names)), int(evaluate(expressions[1], names))
+            if scaled == (width, height):
+                # load_scaled asks for the image itself at its own size
+                chain = ()
+                surface = source
+                file = f"{stem}.png"
+            else:
+                chain = (("scale", scaled),)
+                surface = ImageManager.load_transformed(path, chain)
+                file = f"{stem} {scaled[0]}x{scaled[1]}.png"
+            if any(variant["file"] == file for variant in entry["variants"]):
+                continue
+            if surface.get_colorkey() is not None:
+                # PNGs don't keep colorkeys, so transparency goes in the alpha channel
+                surface = surface.convert_alpha()
+            pygame.image.save(surface, os.path.join(directory, file))
+            entry["variants"].append({"chain": [[name, list(argument)] for name, argument in chain], "file": file})
+            print(f"{path} -> {file}")
+
+    with open(os.path.join(directory, "index.yaml"), "w") as f:
+        f.write(yaml.safe_dump(index, sort_keys=False, default_flow_style=None))
+    return directory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-scale images for a window size, so the game loads them as they're drawn.")
+    parser.add_argument("--size", type=parse_size, default=c.WINDOW_SIZE, help="window size to bake for, like 1280x720")
+    parser.add_argument("--config", default="assets/yaml/bake.yaml", help="the images and sizes to bake")
+    args = parser.parse_args()
+
+    directory = bake(args.config, args.size)
+    print(f"Baked to {directory}")
+
+
+if __name__ == "__main__":
+    main()
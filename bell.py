@@ -1,6 +1,7 @@
 from image_manager import ImageManager
 from primitives import Pose
 import pygame
+from transform_cache import ScaleCache
 import math
 import constants as c
 from robot import Robot
@@ -48,16 +49,29 @@ class Bell:
         self.ding_sound.play()
 
 
-    def draw(self, surface, offset=(0, 0)):
+    def squashed_size(self):
         w = self.width() * (1 - self.squash) + self.width() * self.squash * (math.cos(self.squash * math.pi * 0.65) + 1)
         h = (self.width() * self.height())/w
+        return w, h
+
+    def draw(self, surface, offset=(0, 0)):
+        w, h = self.squashed_size()
         x = self.position.x - w//2 + offset[0]
         y = self.position.y - h//2 + offset[1]
         if self.hovered():
             surf = self.hover_surf
         else:
             surf = self.surf
-        surface.blit(pygame.transform.scale(surf, (w, h)), (x, y))
+        surface.blit(ScaleCache.scale(surf, (w, h)), (x, y))
+
+    def get_rect(self, offset=(0, 0)):
+        w, h = self.squashed_size()
+        rect = pygame.Rect(0, 0, math.ceil(w) + 2, math.ceil(h) + 2)
+        rect.center = self.position.x + offset[0], self.position.y + offset[1]
+        return rect
+
+    def dirty_regions(self, offset=(0, 0)):
+        yield self, self.get_rect(offset), (self.hovered(), self.squashed_size())
 
     def hovered(self):
         mpos = pygame.mouse.get_pos()
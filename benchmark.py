@@ -0,0 +1,235 @@
+import argparse
+import json
+import random
+import sys
+import time
+
+import pygame
+
+import constants as c
+from frame import GameFrame
+from game import Game
+from particle import PoofParticle, FoodParticle
+from primitives import Pose
+from transform_cache import RotationCache
+
+BENCHMARKS = []
+
+
+def benchmark(name, cache=None, min_hit_rate=None):
+    """
+    Registers a benchmark. The decorated function takes a GameFrame and a target surface,
+    and returns the zero-argument callable to time.
+    :param cache: A transform cache whose hit rate over the timed calls is reported
+    :param min_hit_rate: The lowest hit rate that doesn't count as a regression
+    """
+    def register(setup):
+        BENCHMARKS.append((name, setup, cache, min_hit_rate))
+        return setup
+    return register
+
+
+@benchmark("Customer.draw_dialog")
+def customer_draw_dialog(frame, surface):
+    customer = frame.queue.front_customer()
+    customer.window_alpha = 255
+    customer.dialog = "I want something that lights my mouth on fire and causes me physical pain."
+    return lambda: customer.draw_dialog(surface)
+
+
+@benchmark("SpiceEntry.draw_description")
+def spice_entry_draw_description(frame, surface):
+    entry = frame.rack.entries[0]
+    entry.preview.set_position((c.WINDOW_WIDTH//2, c.WINDOW_HEIGHT//2))
+    return lambda: entry.draw_description(surface)
+
+
+@benchmark("FlavorPreview.draw")
+def flavor_preview_draw(frame, surface):
+    preview = frame.pot.preview
+    preview.update_goal_flavor(frame.queue.front_customer().desired_flavor)
+    return lambda: preview.draw(surface)
+
+
+@benchmark("FlavorPreview.marker_tinted")
+def flavor_preview_marker_tinted(frame, surface):
+    preview = frame.pot.preview
+    return lambda: preview.marker_tinted((255, 255, 0))
+
+
+@benchmark("FlavorPreview.flavor_in_range")
+def flavor_preview_flavor_in_range(frame, surface):
+    preview = frame.pot.preview
+    preview.update_goal_flavor(frame.queue.front_customer().desired_flavor)
+    flavor = {c.SPICY: 20, c.SAVORY: 30, c.SWEET: 50}
+    return lambda: preview.flavor_in_range(flavor)
+
+
+@benchmark("Pose.__add__")
+def pose_add(frame, surface):
+    a = Pose((3, 4), 10)
+    b = Pose((5, 6), 20)
+    return lambda: a + b
+
+
+@benchmark("Pose.__mul__")
+def pose_mul(frame, surface):
+    a = Pose((3, 4), 10)
+    return lambda: a * 0.5
+
+
+@benchmark("SpiceRack.set_target_positions")
+def spice_rack_set_target_positions(frame, surface):
+    return frame.rack.set_target_positions
+
+
+@benchmark("PoofParticle.draw")
+def poof_particle_draw(frame, surface):
+    particle = PoofParticle((c.WINDOW_WIDTH//2, c.WINDOW_HEIGHT//2))
+    particle.age = 0.4
+    return lambda: particle.draw(surface)
+
+
+@benchmark("FoodParticle.draw")
+def food_particle_draw(frame, surface):
+    particle = FoodParticle(frame.rack.entries[0].key, frame)
+    particle.position = Pose((c.WINDOW_WIDTH//2, c.WINDOW_HEIGHT//2), 1.3)
+    return lambda: particle.draw(surface)
+
+
+@benchmark("FoodParticle.draw spinning", cache=RotationCache, min_hit_rate=0.9)
+def food_particles_draw_spinning(frame, surface):
+    # Several ingredients falling into the pot at once, each spinning through every rotation bucket
+    particles = []
+    for i, entry in enumerate(frame.rack.entries[:4]):
+        particle = FoodParticle(entry.key, frame)
+        particle.position = Pose((200 + 200*i, c.WINDOW_HEIGHT//2), i)
+        particles.append(particle)
+
+    def draw():
+        for i, particle in enumerate(particles):
+            particle.position.angle += (3 + i)/c.TICK_RATE
+            particle.draw(surface)
+    return draw
+
+
+def measure(function, repeat=5, min_time=0.1):
+    """
+    Times function like timeit does, growing the number of calls until one run takes at least min_time.
+    :return: The best seconds per call over repeat runs, and the number of calls per run
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+    best = elapsed
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, time.perf_counter() - start)
+    return best/number, number
+
+
+def run(names=None, repeat=5, min_time=0.1):
+    random.seed(0)
+    game = Game(headless=True, run=False)
+    surface = pygame.Surface(c.WINDOW_SIZE)
+    results = {}
+    for name, setup, cache, min_hit_rate in BENCHMARKS:
+        if names and name not in names:
+            continue
+        frame = GameFrame(game)
+        frame.queue.queue_customers()
+        function = setup(frame, surface)
+        if cache:
+            hits, misses = cache.hits, cache.misses
+        per_call, number = measure(function, repeat=repeat, min_time=min_time)
+        results[name] = {"us_per_call": per_call * 1000000, "calls": number}
+        if cache:
+            hits, misses = cache.hits - hits, cache.misses - misses
+            results[name]["hit_rate"] = hits/(hits + misses) if hits + misses else 1
+            results[name]["min_hit_rate"] = min_hit_rate
+    return results
+
+
+def low_hit_rates(results):
+    """
+    :return: The names of benchmarks whose cache hit rate fell below their minimum
+    """
+    return [
+        name for name, result in results.items()
+        if result.get("min_hit_rate") is not None and result["hit_rate"] < result["min_hit_rate"]
+    ]
+
+
+def compare(results, baseline, threshold):
+    """
+    :return: The names of benchmarks that got slower than baseline by more than threshold (a ratio)
+    """
+    regressions = []
+    for name in results:
+        if name not in baseline:
+            continue
+        before = baseline[name]["us_per_call"]
+        after = results[name]["us_per_call"]
+        ratio = after/before if before else 1
+        results[name]["baseline_us_per_call"] = before
+        results[name]["ratio"] = ratio
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the hot draw and update paths against the real assets.")
+    parser.add_argument("names", nargs="*", help="benchmarks to run (default: all)")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--save-baseline", help="also write the results here for future comparisons")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio that counts as a regression")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.1, help="seconds each timing run should last")
+    parser.add_argument("--list", action="store_true", help="list benchmark names and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, *_ in BENCHMARKS:
+            print(name)
+        return 0
+
+    results = run(args.names, repeat=args.repeat, min_time=args.min_time)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+    regressions += [name for name in low_hit_rates(results) if name not in regressions]
+
+    output = json.dumps({"results": results, "regressions": regressions}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    for name in regressions:
+        if "ratio" in results[name] and results[name]["ratio"] > args.threshold:
+            print(f"REGRESSION: {name} is {results[name]['ratio']:.2f}x its baseline", file=sys.stderr)
+        else:
+            print(f"REGRESSION: {name} hits its cache {results[name]['hit_rate']:.0%} of the time, "
+                  f"under its minimum of {results[name]['min_hit_rate']:.0%}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import pygame
+
+from draw_list import DrawList
+from image_manager import ImageManager
+
+
+class Layer:
+    """
+    One layer of a Compositor, drawn fresh every frame.
+    """
+
+    def __init__(self, name, draw, shake=True, batched=False):
+        """
+        :param name: Used to time the layer in the frame timer
+        :param draw: Called with (surface, offset) to draw the layer
+        :param shake: Whether screen shake moves this layer
+        :param batched: Whether to record the layer's blits into a DrawList and submit them together.
+            Only for layers that don't use pygame.draw.
+        """
+        self.name = name
+        self.draw_function = draw
+        self.shake = shake
+        self.batched = batched
+
+    def draw(self, surface, offset=(0, 0)):
+        if not self.batched:
+            self.draw_function(surface, offset)
+            return
+        draw_list = DrawList(surface)
+        self.draw_function(draw_list, offset)
+        draw_list.submit()
+
+
+class StaticLayer(Layer):
+    """
+    A layer whose content never changes on its own. It's composited onto one surface the first time it's drawn
+    and costs a single blit after that, until it's invalidated.
+    """
+
+    def __init__(self, name, rect, images, shake=True, alpha=True):
+        """
+        :param name: Used to time the layer in the frame timer
+        :param rect: Where the layer sits on the screen
+        :param images: (surface, screen position) pairs, composited in order
+        :param shake: Whether screen shake moves this layer
+        :param alpha: Whether the layer has transparent parts
+        """
+        super().__init__(name, None, shake)
+        self.rect = pygame.Rect(rect)
+        self.images = images
+        self.alpha = alpha
+        self.surface = None
+
+    def invalidate(self, images=None):
+        """
+        Throws the composited surface away, so it's rebuilt on the next draw.
+        :param images: New (surface, screen position) pairs to build it from, if they changed
+        """
+        if images is not None:
+            self.images = images
+        self.surface = None
+
+    def build(self):
+        if self.alpha:
+            surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        else:
+            surface = pygame.Surface(self.rect.size)
+        for image, position in self.images:
+            if self.alpha:
+                image = ImageManager.unencoded(image)
+            surface.blit(image, (position[0] - self.rect.x, position[1] - self.rect.y))
+        if pygame.display.get_surface():
+            surface = surface.convert_alpha() if self.alpha else surface.convert()
+        return surface
+
+    def draw(self, surface, offset=(0, 0)):
+        if not self.surface:
+            self.surface = self.build()
+        surface.blit(self.surface, (self.rect.x + offset[0], self.rect.y + offset[1]))
+
+
+class Compositor:
+    """
+    Draws a stack of layers bottom to top, applying screen shake to the ones that shake.
+    """
+
+    def __init__(self, layers):
+        self.layers = layers
+
+    def layer(self, name):
+        for layer in self.layers:
+            if layer.name == name:
+                return layer
+        raise KeyError(name)
+
+    def invalidate(self):
+        for layer in self.layers:
+            if isinstance(layer, StaticLayer):
+                layer.invalidate()
+
+    def draw(self, surface, shake_offset=(0, 0), timer=None):
+        for layer in self.layers:
+            offset = shake_offset if layer.shake else (0, 0)
+            if timer:
+                timer.time(layer.name, layer.draw, surface, offset)
+            else:
+                layer.draw(surface, offset)
@@ -6,6 +6,51 @@ CAPTION = "Bot Appetite"
 
 FRAMERATE = 60
 
+# Simulation runs at a fixed rate regardless of framerate, catching up at most this many ticks per frame
+TICK_RATE = 60
+MAX_TICKS_PER_FRAME = 5
+
+# Only redraw and present the parts of the screen that changed during gameplay
+DIRTY_RECTS = False
+
+# Rotated sprites are cached in steps of this many degrees. The cache holds every step of this many spinning
+# 160x160 ingredients at once, whose rotated copies average about 165 KB.
+ROTATION_STEP = 6
+ROTATION_CACHED_SPRITES = 5
+ROTATION_CACHE_BYTES = 360//ROTATION_STEP * 165 * 1024 * ROTATION_CACHED_SPRITES
+
+# Sprites that squash and stretch keep up to this many bytes of scaled copies
+SCALE_CACHE_BYTES = 32 * 1024 * 1024
+
+# Sprites drawn at partial opacity keep faded copies at this many opacity steps, using up to this many bytes
+OPACITY_LEVELS = 64
+OPACITY_CACHE_BYTES = 32 * 1024 * 1024
+
+# ImageManager and SoundManager forget their least recently used unpinned assets past this many bytes
+IMAGE_CACHE_BYTES = 96 * 1024 * 1024
+SOUND_CACHE_BYTES = 64 * 1024 * 1024
+
+# Threads decoding preloaded assets, and how long each frame may spend handing finished ones to the managers
+PRELOAD_WORKERS = 4
+PRELOAD_STEP_SECONDS = 0.004
+
+# Smoke puffs are baked into this many frames over their lifetime, starting from this many rotations
+POOF_FRAMES = 30
+POOF_ROTATIONS = 24
+
+# Simulate splatter and smoke particles in batched NumPy arrays, when NumPy is installed
+PARTICLE_ENGINE = True
+
+# Anything drawn entirely this far outside the window is skipped. Covers screen shake and interpolation.
+CULL_MARGIN = 40
+
+# The most particles each layer holds at once. Past this, low priority particles are culled first.
+PARTICLE_BUDGETS = {
+    "back": 300,
+    "front": 40,
+    "batched": 4000,
+}
+
 SPICY="SPICY"
 SAVORY="SAVORY"
 SWEET="SWEET"
@@ -7,6 +7,10 @@ import math
 import time
 from particle import PoofParticle, PanPoof, ReactionParticle, TintParticle
 from sound_manager import SoundManager
+from transform_cache import RotationCache, OpacityCache
+from viewport import Viewport
+from glyph_atlas import GlyphAtlas
+from text_layout import TextLayout
 
 
 class CustomerQueue:
@@ -63,10 +67,10 @@ class CustomerQueue:
         served_customer.serve(self.frame, flavor)
         self.served_customers.append(served_customer)
         served_customer.plate_appear(self.frame)
-        self.frame.particles.append(ReactionParticle((served_customer.position + Pose((-150, -100))).get_position(), served_customer.happiness))
+        self.frame.add_particle(ReactionParticle.create((served_customer.position + Pose((-150, -100))).get_position(), served_customer.happiness))
         random.choice(self.reaction_sound_dict[served_customer.happiness]).play()
         if served_customer.happiness > 0:
-            self.frame.fronticles.append(TintParticle(color=(255, 255, 255), opacity=128, duration=0.25))
+            self.frame.add_particle(TintParticle(color=(255, 255, 255), opacity=128, duration=0.25), front=True)
         else:
             self.frame.bad_serve()
         self.frame.num_served += 1
@@ -85,8 +89,8 @@ class CustomerQueue:
         if self.front_customer().time_left < -0.05:
             self.frame.shake(30)
             Customer.make_mistake()
-            self.frame.fronticles.append(TintParticle(color=(200, 0, 128), opacity=128, duration=0.4))
-            self.frame.fronticles.append(ReactionParticle((c.WINDOW_WIDTH//2, c.WINDOW_HEIGHT//2 - 160), 4))
+            self.frame.add_particle(TintParticle(color=(200, 0, 128), opacity=128, duration=0.4), front=True)
+            self.frame.add_particle(ReactionParticle.create((c.WINDOW_WIDTH//2, c.WINDOW_HEIGHT//2 - 160), 4), front=True)
             served_customer = self.customers.pop(0)
             self.served_customers.append(served_customer)
             served_customer.update_happiness_surf(0)
@@ -101,9 +105,7 @@ class CustomerQueue:
     def update(self, dt, events):
         for customer in self.customers + self.served_customers:
             customer.update(dt, events)
-            if customer.position.x > c.WINDOW_WIDTH + 500 or customer.position.x < -500:
-                if customer in self.served_customers:
-                    self.served_customers.remove(customer)
+        self.served_customers = [customer for customer in self.served_customers if not customer.gone()]
         self.queue_customers()
         self.update_target_positions()
 
@@ -118,6 +120,10 @@ class CustomerQueue:
         for customer in self.customers[::-1] + self.served_customers:
             customer.draw(surface, offset)
 
+    def dirty_regions(self, offset=(0, 0)):
+        for customer in self.customers + self.served_customers:
+            yield from customer.dirty_regions(offset)
+
     def update_target_positions(self):
         x = c.WINDOW_WIDTH * 0.8
         y = c.WINDOW_HEIGHT//2
@@ -132,8 +138,7 @@ class CustomerQueue:
 
 class Customer:
 
-    SPEAK_FONT = None
-    CHARS = {}
+    SPEAK_GLYPHS = None
     COUNT = -2
 
     MISTAKE_HANDICAP = 0
@@ -141,9 +146,8 @@ class Customer:
     def __init__(self, position, queue, tolerance=1.0, desired_flavor = None):
         Customer.COUNT += 1
 
-        if not self.SPEAK_FONT:
-            Customer.SPEAK_FONT = pygame.font.Font("assets/fonts/corbel.ttf", 24)
-            Customer.CHARS = {char:Customer.SPEAK_FONT.render(char, 1, (0, 0, 0)) for char in c.PRINTABLES}
+        if not self.SPEAK_GLYPHS:
+            Customer.SPEAK_GLYPHS = GlyphAtlas.get("assets/fonts/corbel.ttf", 24, (0, 0, 0))
 
         self.queue = queue
         self.position = Pose(position)
@@ -174,18 +178,18 @@ class Customer:
 
         self.plate_visible = False
         self.plate_position = Pose((c.WINDOW_WIDTH*0.7, c.WINDOW_HEIGHT*0.55))
-        self.plate = ImageManager.load("assets/images/plate.png")
-        self.plate = pygame.transform.scale(self.plate, (self.plate.get_width()*1280/1920, self.plate.get_height()*1280/1920))
+        width, height = ImageManager.size("assets/images/plate.png")
+        self.plate = ImageManager.load_scaled("assets/images/plate.png", (width*1280/1920, height*1280/1920))
 
 
         time_scale = 0.2
-        self.time_bar = ImageManager.load("assets/images/time_bar.png")
-        self.time_bar_frame = ImageManager.load("assets/images/time_frame.png")
-        self.time_bar = pygame.transform.scale(self.time_bar, (self.time_bar.get_width() * time_scale, self.time_bar.get_height()*time_scale))
-        self.time_bar_frame = pygame.transform.scale(self.time_bar_frame, (self.time_bar_frame.get_width() * time_scale, self.time_bar_frame.get_height() * time_scale))
+        width, height = ImageManager.size("assets/images/time_bar.png")
+        self.time_bar = ImageManager.load_scaled("assets/images/time_bar.png", (width * time_scale, height*time_scale))
+        width, height = ImageManager.size("assets/images/time_frame.png")
+        self.time_bar_frame = ImageManager.load_scaled("assets/images/time_frame.png", (width * time_scale, height * time_scale))
         self.time_bar_scale = 0
-        self.clock = ImageManager.load("assets/images/clock.png")
-        self.clock = pygame.transform.scale(self.clock, (self.clock.get_width() * time_scale, self.clock.get_height() * time_scale))
+        width, height = ImageManager.size("assets/images/clock.png")
+        self.clock = ImageManager.load_scaled("assets/images/clock.png", (width * time_scale, height * time_scale))
 
         self.time_left = 1
         self.patience = self.get_patience()
@@ -338,9 +342,9 @@ class Customer:
         self.plate_visible = True
         self.plate_position = Pose((self.position.x, c.WINDOW_HEIGHT*0.60))
         for i in range(10):
-            frame.particles.append(PoofParticle(self.plate_position.get_position(), color=128))
+            frame.add_particle(PoofParticle.create(self.plate_position.get_position(), color=128))
 
-    def draw(self, surface, offset=(0, 0)):
+    def current_surf(self):
         surf = None
         if self.state == c.QUEUED:
             surf = self.queue_surf
@@ -350,9 +354,34 @@ class Customer:
             surf = self.wait_surf
         if self.state == c.SERVED:
             surf = self.serve_surf
+        return surf
+
+    def gone(self):
+        """
+        :return: Whether this customer has been served and walked off the right of the screen for good
+        """
+        if self.state != c.SERVED:
+            return False
+        if self.position.x < -500:
+            return True
+        if self.position.x < c.WINDOW_WIDTH or Viewport.visible(self.get_rect()):
+            return False
+        return not self.plate_visible or not Viewport.visible(self.get_plate_rect())
+
+    def draw(self, surface, offset=(0, 0)):
+        if Viewport.visible(self.get_rect(offset), "customers"):
+            self.draw_body(surface, offset)
+
+        if self.window_alpha > 0:
+            self.draw_dialog(surface, offset)
+
+        self.draw_patience_meter(surface, offset)
+
+    def draw_body(self, surface, offset=(0, 0)):
+        surf = self.current_surf()
 
         if self.position.angle != 0:
-            surf = pygame.transform.rotate(surf, self.position.angle * 180/math.pi)
+            surf = RotationCache.rotate(surf, self.position.angle * 180/math.pi)
 
         w = surf.get_width()
         h = surf.get_height()
@@ -360,10 +389,39 @@ class Customer:
         y = self.position.y + offset[1] - h//2
         surface.blit(surf, (x, y))
 
-        if self.window_alpha > 0:
-            self.draw_dialog(surface, offset)
+    def get_rect(self, offset=(0, 0)):
+        surf = self.current_surf()
+        if self.position.angle != 0:
+            size = math.ceil(max(surf.get_size()) * math.sqrt(2))
+            rect = pygame.Rect(0, 0, size, size)
+        else:
+            rect = surf.get_rect()
+        rect.center = self.position.x + offset[0], self.position.y + offset[1]
+        return rect.inflate(2, 2)
 
-        self.draw_patience_meter(surface, offset)
+    def get_patience_meter_rect(self, offset=(0, 0)):
+        x = self.position.x + offset[0] - 220
+        y = self.position.y + offset[1] - 150
+        rect = pygame.Rect(x, y, self.time_bar_frame.get_width() + 1, self.time_bar_frame.get_height() + 1)
+        return rect.union(pygame.Rect(x - 40, y - 6, self.clock.get_width() + 1, self.clock.get_height() + 1))
+
+    def get_dialog_rect(self):
+        return pygame.Rect(c.WINDOW_WIDTH - self.window.get_width(), 0, self.window.get_width(), self.window.get_height())
+
+    def get_plate_rect(self, offset=(0, 0)):
+        rect = self.plate.get_rect()
+        rect.center = self.plate_position.x + offset[0], self.plate_position.y + offset[1]
+        return rect.inflate(2, 2)
+
+    def dirty_regions(self, offset=(0, 0)):
+        yield (self, "body"), self.get_rect(offset), (self.state, int(self.position.x), int(self.position.y))
+        if self.state == c.SPEAKING:
+            yield (self, "meter"), self.get_patience_meter_rect(offset), int(self.time_bar.get_width() * self.time_left)
+        if self.window_alpha > 0:
+            # The text wobbles every frame
+            yield (self, "dialog"), self.get_dialog_rect(), None
+        if self.plate_visible:
+            yield (self, "plate"), self.get_plate_rect(offset), (int(self.plate_position.x), int(self.plate_position.y))
 
     def draw_patience_meter(self, surface, offset=(0, 0)):
 
@@ -376,54 +434,23 @@ class Customer:
 
         width = self.time_left/1
         if width > 0:
-            front = pygame.Surface((self.time_bar.get_width() * width, self.time_bar.get_height()))
-            front.fill((255, 0, 255))
-            front.blit(self.time_bar, (0, 0))
-            front.set_colorkey((255, 0, 255))
-            surface.blit(front, (x, y))
+            surface.blit(self.time_bar, (x, y), (0, 0, self.time_bar.get_width() * width, self.time_bar.get_height()))
 
         surface.blit(self.clock, (x - 40, y - 6))
 
     def draw_plate(self, surface, offset=(0, 0)):
-        if self.plate_visible:
+        if self.plate_visible and Viewport.visible(self.get_plate_rect(offset), "plates"):
             x = self.plate_position.x + offset[0] - self.plate.get_width()//2
             y = self.plate_position.y + offset[1] - self.plate.get_height()//2
             surface.blit((self.plate), (x, y))
 
     def draw_dialog(self, surface, offset=(0, 0)):
-        self.window.set_alpha(self.window_alpha)
-        surface.blit(self.window, (c.WINDOW_WIDTH - self.window.get_width(), 0))
+        OpacityCache.blit(surface, self.window, (c.WINDOW_WIDTH - self.window.get_width(), 0), self.window_alpha)
 
         x = c.WINDOW_WIDTH - 450
         y = 28
         w = 420
         h = 80
         spacing = 30
-        words = self.dialog.split(" ")
-        lines = []
-        current_line = ""
-        line_width = 0
-        for word in words:
-            word_width = sum(Customer.CHARS[char].get_width() for char in word)
-            if line_width + word_width > w:
-                lines.append(current_line)
-                current_line = ""
-                line_width = 0
-
-            current_line += word + " "
-            line_width += word_width + Customer.CHARS[" "].get_width()
-        if current_line:
-            lines.append(current_line)
-
-        x0 = x
-        y0 = y + h/2
-        y0 -= spacing*len(lines)/2
-        for line in lines:
-            line_width = sum([Customer.CHARS[char].get_width() for char in line])
-            x = x0 - line_width//2 + w//2
-            for i, char in enumerate(line):
-                xp, yp = x, y0
-                yp += math.sin(time.time()*-20 + i*2.6)*1
-                surface.blit(Customer.CHARS[char], (xp, yp))
-                x += Customer.CHARS[char].get_width()
-            y0 += spacing
\ No newline at end of file
+        layout = TextLayout.get(self.dialog, Customer.SPEAK_GLYPHS, w, h, spacing)
+        layout.draw(surface, (x, y), time.time(), -20, 2.6)
@@ -0,0 +1,81 @@
+import pygame
+
+import constants as c
+
+
+class DirtyRectTracker:
+    """
+    Works out which parts of the screen need redrawing by comparing the regions components report each frame
+    against the ones they reported last frame.
+
+    A region is a (key, rect, signature) tuple. The key identifies the region across frames, rect is where it
+    draws, and signature is anything that changes when its appearance does. A signature of None means the
+    region changes every frame.
+    """
+
+    def __init__(self, max_rects=4, max_coverage=0.6):
+        """
+        :param max_rects: Past this many separate rects, redraw their bounding box instead
+        :param max_coverage: Past this fraction of the screen, redraw everything instead
+        """
+        self.max_rects = max_rects
+        self.max_coverage = max_coverage
+        self.screen_rect = pygame.Rect(0, 0, c.WINDOW_WIDTH, c.WINDOW_HEIGHT)
+        self.previous = None
+
+    def invalidate(self):
+        """ Forces the next frame to be a full redraw """
+        self.previous = None
+
+    def update(self, regions, full=False):
+        """
+        :param regions: Every region drawn this frame
+        :param full: Whether this frame has to be redrawn in full anyway
+        :return: The rects to redraw, or None to redraw the whole screen
+        """
+        current = {}
+        for key, rect, signature in regions:
+            if rect is None:
+                continue
+            current[key] = (pygame.Rect(rect), signature)
+
+        previous = self.previous
+        self.previous = current
+        if full or previous is None:
+            return None
+
+        dirty = []
+        for key, (rect, signature) in current.items():
+            old = previous.get(key)
+            if old is None:
+                dirty.append(rect)
+                continue
+            old_rect, old_signature = old
+            if signature is None or signature != old_signature or rect != old_rect:
+                dirty.append(rect)
+                dirty.append(old_rect)
+        for key, (rect, signature) in previous.items():
+            if key not in current:
+                dirty.append(rect)
+
+        return self.merge(dirty)
+
+    def merge(self, rects):
+        merged = []
+        for rect in rects:
+            rect = rect.clip(self.screen_rect)
+            if not rect.w or not rect.h:
+                continue
+            # Swallow anything this overlaps, and keep going until nothing else does
+            index = rect.collidelist(merged)
+            while index != -1:
+                rect.union_ip(merged.pop(index))
+                index = rect.collidelist(merged)
+            merged.append(rect)
+
+        if len(merged) > self.max_rects:
+            merged = [merged[0].unionall(merged[1:])]
+        area = sum(rect.w * rect.h for rect in merged)
+        if area > self.max_coverage * self.screen_rect.w * self.screen_rect.h:
+            return None
+        return merged
@@ -0,0 +1,52 @@
+class DrawList:
+    """
+    Stands in for a surface while a component draws, recording blits instead of making them.
+    submit() replays them in order with Surface.blits, one call per run of blits with the same blend flags.
+    Anything else asked of it submits what's recorded so far and goes to the real surface, so order is kept.
+    pygame.draw functions need a real surface, so components that use them can't draw into a DrawList, and
+    nothing blitted into one can be changed before it's submitted.
+    """
+
+    def __init__(self, surface):
+        self.surface = surface
+        self.commands = []
+        self.blit_count = 0
+        self.call_count = 0
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        self.commands.append((source, dest, area, special_flags))
+
+    def blits(self, blit_sequence, doreturn=True):
+        for command in blit_sequence:
+            self.blit(*command)
+
+    def submit(self):
+        """
+        Draws everything recorded since the last submit.
+        """
+        commands = self.commands
+        if not commands:
+            return
+        self.commands = []
+        run = [commands[0]]
+        for command in commands[1:]:
+            if command[3] != run[0][3]:
+                self.surface.blits(run, doreturn=False)
+                self.call_count += 1
+                run = []
+            run.append(command)
+        self.surface.blits(run, doreturn=False)
+        self.call_count += 1
+        self.blit_count += len(commands)
+
+    @staticmethod
+    def submit_pending(surface):
+        """
+        Draws whatever's recorded, if surface is a DrawList, so its sources can be changed safely.
+        """
+        if isinstance(surface, DrawList):
+            surface.submit()
+
+    def __getattr__(self, name):
+        self.submit()
+        return getattr(self.surface, name)
@@ -4,6 +4,7 @@ from primitives import Pose
 import pygame
 from image_manager import ImageManager
 import time
+from transform_cache import ScaleCache
 
 class FlavorPreview:
 
@@ -13,18 +14,14 @@ class FlavorPreview:
         self.points = self.get_points()
         self.position = Pose(position)
         self.normalize_flavors()
-        self.icons = {key: ImageManager.load(c.FLAVOR_ICONS[key]) for key in c.FLAVORS}
-        self.you_are_here = ImageManager.load("assets/images/you_are_here.png")
         w = 64 * radius/200
         h = 64 * radius/200
-        self.you_are_here = pygame.transform.scale(self.you_are_here, (w, h))
+        self.you_are_here = ImageManager.load_scaled("assets/images/you_are_here.png", (w, h))
         self.here_shadow = pygame.Surface((14*radius//200, 14*radius//200))
         self.here_shadow.fill((255, 255, 255))
         self.here_shadow.set_colorkey((255, 255, 255))
         pygame.draw.ellipse(self.here_shadow,(0, 0, 0), self.here_shadow.get_rect())
-        for key in self.icons:
-            surf = self.icons[key]
-            self.icons[key] = pygame.transform.scale(surf, (w, h))
+        self.icons = {key: ImageManager.load_scaled(c.FLAVOR_ICONS[key], (w, h)) for key in c.FLAVORS}
         self.flavor_pos = self.position.copy()
         self.target_flavor_pos = self.flavor_pos.copy()
         self.target_flavor = target_flavor.copy() if target_flavor else None
@@ -158,6 +155,30 @@ class FlavorPreview:
     def clear_goal_vis(self):
         self.target_target_overlay_alpha = 0
 
+    def get_rect(self, offset=(0, 0)):
+        """
+        :return: The screen area the preview draws to, or None if it doesn't draw
+        """
+        if self.position.x == 0 or self.position.y == 0:
+            return None
+        position = self.position + Pose(offset)
+        half_width = self.radius * math.sqrt(3)/2
+        rect = pygame.Rect(position.x - half_width, position.y - self.radius, half_width * 2, self.radius * 1.5)
+        if self.radius > 100:
+            # Icons on the corners and the marker above the current flavor
+            icon = self.you_are_here.get_width()
+            rect.inflate_ip(icon, icon)
+            marker = pygame.Rect(0, 0, icon, icon + 8)
+            marker.midbottom = self.flavor_pos.x + offset[0], self.flavor_pos.y + offset[1]
+            rect.union_ip(marker)
+        else:
+            rect.inflate_ip(32, 32)
+        return rect.inflate(6, 6)
+
+    def dirty_regions(self, offset=(0, 0)):
+        # The marker bobs every frame
+        yield self, self.get_rect(offset), None
+
     def draw(self, surface, offset=(0, 0)):
         if self.position.x == 0 or self.position.y == 0:
             return
@@ -209,5 +230,5 @@ class FlavorPreview:
             h = 32 * scale
             x = self.flavor_pos.x -w //2 + offset[0]
             y = self.flavor_pos.y - h//2 + offset[1]
-            smarker = pygame.transform.scale((self.smarker), (w, h))
+            smarker = ScaleCache.scale(self.smarker, (w, h))
             surface.blit(smarker, (x, y))
\ No newline at end of file
@@ -0,0 +1,42 @@
+import pygame
+
+
+class FontManager:
+    """
+    Static class to handle loading of pygame fonts, so each font file is only opened once per size
+    """
+
+    initialized = False
+    fonts = None
+
+    @staticmethod
+    def init():
+        FontManager.initialized = True
+        FontManager.fonts = {}
+
+    @staticmethod
+    def check_initialized():
+        if not FontManager.initialized:
+            raise Exception("Must call FontManager.init() before any other methods.")
+
+    @staticmethod
+    def clear_all():
+        """
+        Forgets everything
+        """
+        FontManager.check_initialized()
+        FontManager.fonts = {}
+
+    @staticmethod
+    def load(path, size):
+        """
+        Loads a font from file or from cache
+        :param path: The path of the font file
+        :param size: The font size
+        :return: The font. It's shared, so don't change its style.
+        """
+        FontManager.check_initialized()
+        key = (path, size)
+        if key not in FontManager.fonts:
+            FontManager.fonts[key] = pygame.font.Font(path, size)
+        return FontManager.fonts[key]
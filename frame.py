@@ -1,14 +1,22 @@
-from particle import TintParticle, LifeParticle
+from particle import TintParticle, LifeParticle, PoofParticle
 from primitives import Pose
 from spice_rack import SpiceRack
 import constants as c
 import pygame
 from pot import Pot
 from image_manager import ImageManager
+from font_manager import FontManager
 from bell import Bell
 from customer_queue import CustomerQueue, Customer
 from ingredient import Ingredient
 from robot import Robot
+from dirty_rects import DirtyRectTracker
+from compositor import Compositor, Layer, StaticLayer
+from backdrop import ScrollingBackdrop
+from tint_compositor import TintCompositor
+from viewport import Viewport
+from particle_manager import ParticleManager
+from particle_pool import ParticlePool
 import math
 import time
 
@@ -16,6 +24,8 @@ class Frame:
     def __init__(self, game):
         self.game = game
         self.done = False
+        self.previous_poses = {}
+        self.updated_rects = None
 
     def load(self):
         pass
@@ -26,6 +36,36 @@ class Frame:
     def draw(self, surface, offset=(0, 0)):
         surface.fill((0, 0, 0))
 
+    def interpolated_poses(self):
+        """
+        :return: (object, attribute name) pairs for every Pose that should be interpolated between ticks
+        """
+        return ()
+
+    def store_previous(self):
+        """
+        Remembers where everything is before a tick, so draw_interpolated can blend towards the result.
+        """
+        self.previous_poses = {(item, name): getattr(item, name).copy() for item, name in self.interpolated_poses()}
+
+    def draw_interpolated(self, surface, weight, offset=(0, 0)):
+        """
+        Draws the frame as it would look weight of the way between the previous tick and the current one.
+        """
+        swapped = []
+        for item, name in self.interpolated_poses():
+            previous = self.previous_poses.get((item, name))
+            if previous is None:
+                continue
+            current = getattr(item, name)
+            setattr(item, name, previous.interpolate(current, weight))
+            swapped.append((item, name, current))
+        try:
+            self.draw(surface, offset)
+        finally:
+            for item, name, current in swapped:
+                setattr(item, name, current)
+
     def next_frame(self):
         return Frame()
 
@@ -40,19 +80,22 @@ class GameFrame(Frame):
         self.bell = Bell((c.WINDOW_WIDTH * 0.6, c.WINDOW_HEIGHT * 0.62), self)
         super().__init__(game)
 
-        self.item_counter = ImageManager.load("assets/images/item_counter.png")
-        self.item_counter = pygame.transform.scale(self.item_counter, (c.WINDOW_WIDTH, self.item_counter.get_height() * (c.WINDOW_WIDTH/self.item_counter.get_width())))
-        self.counter = ImageManager.load("assets/images/counter_back.png")
-        self.counter = pygame.transform.scale(self.counter, (c.WINDOW_WIDTH, self.counter.get_height() * (c.WINDOW_WIDTH/self.counter.get_width())))
+        width, height = ImageManager.size("assets/images/item_counter.png")
+        self.item_counter = ImageManager.load_scaled("assets/images/item_counter.png", (c.WINDOW_WIDTH, height * (c.WINDOW_WIDTH/width)))
+        width, height = ImageManager.size("assets/images/counter_back.png")
+        self.counter = ImageManager.load_scaled("assets/images/counter_back.png", (c.WINDOW_WIDTH, height * (c.WINDOW_WIDTH/width)))
         self.queue = CustomerQueue(self)
 
         self.background = ImageManager.load("assets/images/background.png")
 
-        self.hfont = pygame.font.Font("assets/fonts/corbel.ttf", 20)
+        self.hfont = FontManager.load("assets/fonts/corbel.ttf", 20)
         self.hsurf = self.hfont.render("SERVE", 1, (0, 0, 0))
 
-        self.particles = []
-        self.fronticles = []
+        ParticlePool.clear()
+        self.particle_manager = ParticleManager()
+        self.particles = self.particle_manager.back
+        self.fronticles = self.particle_manager.front
+        self.particle_engine = self.particle_manager.engine
         self.robot = Robot(self)
 
         self.since_shake = 0
@@ -60,11 +103,13 @@ class GameFrame(Frame):
 
         self.lives = 3
 
-        self.fronticles.append(TintParticle(color=(0, 0, 0)))
+        self.add_particle(TintParticle(color=(0, 0, 0)), front=True)
 
-        self.shade = pygame.Surface((c.WINDOW_WIDTH, c.WINDOW_HEIGHT))
-        self.shade.fill((0, 0, 0))
         self.shade_alpha = 0
+        self.tints = TintCompositor()
+
+        self.dirty_rects = DirtyRectTracker()
+        self.compositor = self.build_compositor()
 
         Customer.COUNT = -2
 
@@ -78,13 +123,16 @@ class GameFrame(Frame):
         pygame.mixer.music.play(-1)
         pygame.mixer.music.set_volume(0.35)
 
+    def load(self):
+        PoofParticle.bake()
+
     def lose_life(self):
         self.lives -= 1
-        self.fronticles.append(LifeParticle(lives=self.lives))
+        self.add_particle(LifeParticle(lives=self.lives), front=True)
         print(self.lives)
 
     def bad_serve(self):
-        self.fronticles.append(TintParticle(color=(255, 0, 0), opacity=100, duration=0.3))
+        self.add_particle(TintParticle(color=(255, 0, 0), opacity=100, duration=0.3), front=True)
         self.lose_life()
 
     def update_shake(self, dt, events):
@@ -100,70 +148,157 @@ class GameFrame(Frame):
         return (x, y)
 
     def add_particle(self, particle, front=False):
-        if front:
-            self.fronticles.append(particle)
-            return
-        self.particles.append(particle)
+        return self.particle_manager.add(particle, front)
 
     def draw_particles(self, surface, offset=(0, 0)):
         for particle in self.particles:
-            particle.draw(surface, offset)
+            if Viewport.visible(particle.get_rect(offset), "particles"):
+                particle.draw(surface, offset)
+        if self.particle_engine is not None:
+            self.particle_engine.draw(surface, offset)
 
     def draw_fronticles(self, surface, offset=(0, 0)):
+        # Tints next to each other are blended as one, and whatever's left over is flushed by draw_shade
         for fronticle in self.fronticles:
-            fronticle.draw(surface, offset)
+            if isinstance(fronticle, TintParticle):
+                self.tints.add(*fronticle.tint())
+                continue
+            self.tints.flush(surface)
+            if Viewport.visible(fronticle.get_rect(offset), "fronticles"):
+                fronticle.draw(surface, offset)
 
     def shake(self, amt=15):
         self.since_shake = 0
         self.shake_amt = amt
 
-    def draw(self, surface, offset=(0, 0)):
-        surface.blit(self.background, offset)
-        offset = self.get_shake_offset()
-        self.queue.draw(surface, offset)
-        surface.blit(self.counter, (0, c.WINDOW_HEIGHT - self.counter.get_height()))
+    def dirty_regions(self, offset=(0, 0)):
+        yield from self.queue.dirty_regions(offset)
+        yield from self.robot.dirty_regions((0, 0))
+        yield from self.game.frame_timer.dirty_regions()
+        yield from self.bell.dirty_regions(offset)
+        yield from self.pot.dirty_regions(offset)
+        yield from self.rack.dirty_regions(offset)
+        for particle in self.particles:
+            yield from particle.dirty_regions(offset)
+        if self.particle_engine is not None:
+            yield from self.particle_engine.dirty_regions(offset)
+        for particle in self.fronticles:
+            yield from particle.dirty_regions(offset)
 
-        self.robot.draw_dialog(surface, offset)
+    def needs_full_redraw(self):
+        if self.shake_amt > 0 or self.shade_alpha > 0:
+            return True
+        return any(isinstance(particle, TintParticle) for particle in self.fronticles)
 
-        self.draw_counter(surface, offset)
-        self.bell.draw(surface, offset)
-        self.queue.draw_plates(surface, offset)
-        self.pot.draw(surface, offset)
+    def draw(self, surface, offset=(0, 0)):
+        """
+        Draws the whole scene, or in dirty rect mode just the parts of it that changed since the last frame.
+        The rects drawn are left in updated_rects for the game to present, or None for the whole screen.
+        """
+        self.updated_rects = None
+        if not self.game.dirty_rects:
+            self.draw_scene(surface, offset)
+            return
 
-        self.robot.draw(surface, offset=(0, 0))
-        self.rack.draw(surface, offset)
-        self.draw_fronticles(surface, offset)
+        regions = self.dirty_regions(self.get_shake_offset())
+        rects = self.game.frame_timer.time("dirty_rects", self.dirty_rects.update, regions, self.needs_full_redraw())
+        if rects is None:
+            self.draw_scene(surface, offset)
+            return
+        if rects:
+            # One pass clipped to all of them, so each layer is only drawn, timed and counted once
+            surface.set_clip(rects[0].unionall(rects[1:]))
+            self.draw_scene(surface, offset)
+            surface.set_clip(None)
+        self.updated_rects = rects
+
+    def build_compositor(self):
+        counter_y = c.WINDOW_HEIGHT - self.counter.get_height()
+        item_counter_y = c.WINDOW_HEIGHT - self.item_counter.get_height()
+        return Compositor([
+            StaticLayer("background", self.background.get_rect(), [(self.background, (0, 0))], shake=False, alpha=False),
+            Layer("queue.draw", self.queue.draw, batched=True),
+            # The robot's dialog never reaches down to the counter, so both counters can be one layer
+            StaticLayer("counter", (0, counter_y, c.WINDOW_WIDTH, c.WINDOW_HEIGHT - counter_y), [
+                (self.counter, (0, counter_y)),
+                (self.item_counter, (0, item_counter_y)),
+            ], shake=False),
+            Layer("robot.draw_dialog", self.robot.draw_dialog, batched=True),
+            Layer("bell.draw", self.bell.draw, batched=True),
+            Layer("queue.draw_plates", self.queue.draw_plates, batched=True),
+            Layer("pot.preview", self.pot.preview.draw),
+            StaticLayer("pot.back", self.pot.back_rect(), [(self.pot.bowl_back, self.pot.BACK_POSITION)]),
+            Layer("draw_particles", self.draw_particles),
+            StaticLayer("pot.front", self.pot.front_rect(), [(self.pot.bowl_front, self.pot.FRONT_POSITION)]),
+            Layer("robot.draw", self.robot.draw, shake=False, batched=True),
+            Layer("rack.draw", self.rack.draw, shake=False),
+            Layer("draw_fronticles", self.draw_fronticles),
+            Layer("shade", self.draw_shade, shake=False),
+        ])
+
+    def draw_scene(self, surface, offset=(0, 0)):
+        self.compositor.draw(surface, self.get_shake_offset(), self.game.frame_timer)
 
         #surface.blit(self.hsurf, (10, 10))
 
-        if self.shade_alpha > 0:
-            self.shade.set_alpha(self.shade_alpha)
-            surface.blit(self.shade, (0, 0))
+    def draw_shade(self, surface, offset=(0, 0)):
+        # Merges with any tints the fronticles left unflushed, since this layer comes right after theirs
+        self.tints.add((0, 0, 0), self.shade_alpha)
+        self.tints.flush(surface)
 
-    def draw_counter(self, surface, offset=(0, 0)):
+    def interpolated_poses(self):
+        for customer in self.queue.customers + self.queue.served_customers:
+            yield customer, "position"
+            yield customer, "plate_position"
+        for particle in self.particles:
+            yield particle, "position"
+        for particle in self.fronticles:
+            yield particle, "position"
+        for entry in self.rack.entries:
+            yield entry, "position"
+        yield self.robot, "position"
+        yield self.pot.preview, "flavor_pos"
+
+    def store_previous(self):
+        super().store_previous()
+        if self.particle_engine is not None:
+            self.particle_engine.store_previous()
+
+    def draw_interpolated(self, surface, weight, offset=(0, 0)):
+        if self.particle_engine is None:
+            super().draw_interpolated(surface, weight, offset)
+            return
+        self.particle_engine.weight = weight
+        try:
+            super().draw_interpolated(surface, weight, offset)
+        finally:
+            self.particle_engine.weight = 1
 
-        surface.blit(self.item_counter, (0, c.WINDOW_HEIGHT - self.item_counter.get_height()))
+    def update_particles(self, dt, events):
+        # Anything adopted while the objects update waits until the next tick, like new objects do
+        if self.particle_engine is not None:
+            self.particle_engine.update(dt)
+        self.particles.update(dt, events)
+
+    def update_fronticles(self, dt, events):
+        self.fronticles.update(dt, events)
 
     def update(self, dt, events):
-        self.queue.update(dt, events)
-        self.rack.update(dt, events)
-        self.pot.update(dt, events)
+        ParticlePool.recycle()
+        timer = self.game.frame_timer
+        timer.time("queue.update", self.queue.update, dt, events)
+        timer.time("rack.update", self.rack.update, dt, events)
+        timer.time("pot.update", self.pot.update, dt, events)
         self.update_shake(dt, events)
         for event in events:
             if event.type == pygame.KEYDOWN:
                 self.rack.add_ingredients({
                     "sugar": 1,
                 })
-        self.bell.update(dt, events)
-        for particle in self.particles[:]:
-            particle.update(dt, events)
-            if particle.destroyed:
-                self.particles.remove(particle)
-        for particle in self.fronticles[:]:
-            particle.update(dt, events)
-            if particle.destroyed:
-                self.fronticles.remove(particle)
-        self.robot.update(dt, events)
+        timer.time("bell.update", self.bell.update, dt, events)
+        timer.time("update_particles", self.update_particles, dt, events)
+        timer.time("update_fronticles", self.update_fronticles, dt, events)
+        timer.time("robot.update", self.robot.update, dt, events)
 
         if self.lives < 0:
             self.shade_alpha += 255*dt
@@ -172,8 +307,9 @@ class GameFrame(Frame):
 
 
     def next_frame(self):
-        qsb = int((self.total_time_save/self.num_served * 2000)//100 * 100)
-        rm = round(self.total_rating/self.num_served, 1)
+        served = max(self.num_served, 1)
+        qsb = int((self.total_time_save/served * 2000)//100 * 100)
+        rm = round(self.total_rating/served, 1)
         score = self.num_served*100*rm + qsb
         ingredients_used = [(key, self.ingredients_used[key]) for key in self.ingredients_used]
         if not ingredients_used:
@@ -190,7 +326,7 @@ class GameFrame(Frame):
             ("FAVORITE INGREDIENT", favorite.upper()),
                 ("FINAL SCORE", f"{int(score)}"),
         ]
-        return Stats(self.game)
+        return Loading(self.game, "stats", Stats)
 
     def happiness_flare(self, happiness):
         pass
@@ -201,43 +337,21 @@ class Stats(Frame):
     def __init__(self, game):
         super().__init__(game)
 
-        self.shadows = [
-            ImageManager.load("assets/images/spicy_shadow.png"),
-            ImageManager.load("assets/images/savory_shadow.png"),
-            ImageManager.load("assets/images/sweet_shadow.png"),
-        ]
-        for i, shadow in enumerate(self.shadows):
-            self.shadows[i] = pygame.transform.scale(shadow, (32, 32))
-            #self.shadows[i].set_alpha(100)
-
-        width = 160
-        height = width//3
-        self.tile = pygame.Surface((width, height))
-        self.tile.fill((255, 0, 255))
-        self.tile.set_colorkey((255, 0, 255))
-        x = width//6
-        for i, item in enumerate(self.shadows):
-            xf = x - item.get_width()//2
-            yf = height//2 - item.get_height()//2
-            self.tile.blit(item, (xf, yf))
-            x += width//3
-        self.tile.set_alpha(50)
-
-        self.shade = pygame.Surface((c.WINDOW_WIDTH, c.WINDOW_HEIGHT))
-        self.shade.fill((0, 0, 0))
+        self.backdrop = ScrollingBackdrop()
+
         self.shade_alpha = 255
         self.shade_target = 0
 
-        title_font = pygame.font.Font("assets/fonts/AllTheWayToTheSun.ttf", 80)
+        title_font = FontManager.load("assets/fonts/AllTheWayToTheSun.ttf", 80)
         title = title_font.render("RESULTS", 1, (255, 255, 255))
         self.title = title
 
-        self.label_font = pygame.font.Font("assets/fonts/AllTheWayToTheSun.ttf", 30)
-        self.value_font = pygame.font.Font("assets/fonts/AllTheWayToTheSun.ttf", 30)
+        self.label_font = FontManager.load("assets/fonts/AllTheWayToTheSun.ttf", 30)
+        self.value_font = FontManager.load("assets/fonts/AllTheWayToTheSun.ttf", 30)
 
         self.labels_values = self.game.lvs
 
-        self.enter_font = pygame.font.Font("assets/fonts/AllTheWayToTheSun.ttf", 20)
+        self.enter_font = FontManager.load("assets/fonts/AllTheWayToTheSun.ttf", 20)
         self.enter = self.enter_font.render("Press Enter to try again", 1, (255, 255, 255))
         self.enter.set_alpha(128)
 
@@ -263,6 +377,7 @@ class Stats(Frame):
 
 
     def update(self, dt, events):
+        self.backdrop.update(dt, events)
         if self.shade_target < self.shade_alpha:
             self.shade_alpha -= 500*dt
             if self.shade_alpha < 0:
@@ -284,22 +399,7 @@ class Stats(Frame):
     def draw(self, surface, offset=(0, 0)):
 
         yoff = 30
-        surface.fill((0, 60, 80))
-        interval = 2
-        t = time.time()
-        x = -2*self.tile.get_width() + ((t*20)%self.tile.get_width())
-        y = -7*self.tile.get_height() + ((t*10)%(6*self.tile.get_height()))
-        x0 = x
-        y0 = y
-        while y < c.WINDOW_HEIGHT + 50:
-            x0 += self.tile.get_width()//6
-            x0 %= self.tile.get_width()
-            x0 -= self.tile.get_width()
-            x = x0
-            while x < c.WINDOW_WIDTH + 50:
-                surface.blit(self.tile, (x, y))
-                x += self.tile.get_width()
-            y += self.tile.get_height()
+        self.backdrop.draw(surface)
 
         surface.blit(self.title, (c.WINDOW_WIDTH//2 - self.title.get_width()//2, 80 + yoff))
 
@@ -313,50 +413,26 @@ class Stats(Frame):
         if time.time()%1 < 0.7:
             surface.blit(self.enter, (c.WINDOW_WIDTH//2 - self.enter.get_width()//2, c.WINDOW_HEIGHT - 70))
 
-        if self.shade_alpha > 0:
-            self.shade.set_alpha(self.shade_alpha)
-            surface.blit(self.shade, (0, 0))
+        TintCompositor.blend(surface, (0, 0, 0), self.shade_alpha)
 
     def next_frame(self):
-        return GameFrame(self.game)
+        return Loading(self.game, "game", GameFrame)
 
 
 class Title(Frame):
     def __init__(self, game):
         super().__init__(game)
 
-        self.shadows = [
-            ImageManager.load("assets/images/spicy_shadow.png"),
-            ImageManager.load("assets/images/savory_shadow.png"),
-            ImageManager.load("assets/images/sweet_shadow.png"),
-        ]
-        for i, shadow in enumerate(self.shadows):
-            self.shadows[i] = pygame.transform.scale(shadow, (32, 32))
-            #self.shadows[i].set_alpha(100)
-
-        width = 160
-        height = width//3
-        self.tile = pygame.Surface((width, height))
-        self.tile.fill((255, 0, 255))
-        self.tile.set_colorkey((255, 0, 255))
-        x = width//6
-        for i, item in enumerate(self.shadows):
-            xf = x - item.get_width()//2
-            yf = height//2 - item.get_height()//2
-            self.tile.blit(item, (xf, yf))
-            x += width//3
-        self.tile.set_alpha(50)
-
-        self.shade = pygame.Surface((c.WINDOW_WIDTH, c.WINDOW_HEIGHT))
-        self.shade.fill((0, 0, 0))
+        self.backdrop = ScrollingBackdrop()
+
         self.shade_alpha = 255
         self.shade_target = 0
 
-        self.enter_font = pygame.font.Font("assets/fonts/AllTheWayToTheSun.ttf", 20)
+        self.enter_font = FontManager.load("assets/fonts/AllTheWayToTheSun.ttf", 20)
         self.enter = self.enter_font.render("Press Enter to play", 1, (255, 255, 255))
         self.enter.set_alpha(128)
 
-        title_font = pygame.font.Font("assets/fonts/AllTheWayToTheSun.ttf", 102)
+        title_font = FontManager.load("assets/fonts/AllTheWayToTheSun.ttf", 102)
         title = title_font.render("BOT APPETIT", 1, (255, 255, 255))
         self.title = title
 
@@ -365,6 +441,7 @@ class Title(Frame):
         pygame.mixer.music.set_volume(1.0)
 
     def update(self, dt, events):
+        self.backdrop.update(dt, events)
         if self.shade_target < self.shade_alpha:
             self.shade_alpha -= 500*dt
             if self.shade_alpha < 0:
@@ -387,30 +464,50 @@ class Title(Frame):
 
     def draw(self, surface, offset=(0, 0)):
 
-        surface.fill((0, 60, 80))
-        interval = 2
-        t = time.time()
-        x = -2*self.tile.get_width() + ((t*20)%self.tile.get_width())
-        y = -7*self.tile.get_height() + ((t*10)%(6*self.tile.get_height()))
-        x0 = x
-        y0 = y
-        while y < c.WINDOW_HEIGHT + 50:
-            x0 += self.tile.get_width()//6
-            x0 %= self.tile.get_width()
-            x0 -= self.tile.get_width()
-            x = x0
-            while x < c.WINDOW_WIDTH + 50:
-                surface.blit(self.tile, (x, y))
-                x += self.tile.get_width()
-            y += self.tile.get_height()
+        self.backdrop.draw(surface)
 
         if time.time()%1 < 0.7:
             surface.blit(self.enter, (c.WINDOW_WIDTH//2 - self.enter.get_width()//2, c.WINDOW_HEIGHT - 70))
         surface.blit(self.title, (c.WINDOW_WIDTH//2 - self.title.get_width()//2, c.WINDOW_HEIGHT//2 - self.title.get_height()//2))
 
-        if self.shade_alpha > 0:
-            self.shade.set_alpha(self.shade_alpha)
-            surface.blit(self.shade, (0, 0))
+        TintCompositor.blend(surface, (0, 0, 0), self.shade_alpha)
+
+    def next_frame(self):
+        return Loading(self.game, "game", GameFrame)
+
+
+class Loading(Frame):
+    """
+    Shows a progress bar while a manifest group is preloaded, then moves on to the frame that needs it.
+    If the group is already cached, it moves on after a single tick.
+    """
+
+    def __init__(self, game, group, frame_type):
+        """
+        :param group: The preload manifest group to wait for
+        :param frame_type: The Frame subclass to start once it's loaded
+        """
+        super().__init__(game)
+        self.group = group
+        self.frame_type = frame_type
+        self.game.preloader.request(group, pin=True)
+
+    def update(self, dt, events):
+        # Anything evicted since the last tick is asked for again
+        self.game.preloader.request(self.group)
+        self.game.preloader.update()
+        if self.game.preloader.ready(self.group):
+            self.done = True
+
+    def draw(self, surface, offset=(0, 0)):
+        surface.fill((0, 0, 0))
+        width = c.WINDOW_WIDTH//3
+        rect = pygame.Rect(0, 0, width, 12)
+        rect.center = c.WINDOW_WIDTH//2, c.WINDOW_HEIGHT//2
+        pygame.draw.rect(surface, (80, 80, 80), rect, 1)
+        rect.width = round(width * self.game.preloader.progress(self.group))
+        pygame.draw.rect(surface, (255, 255, 255), rect)
 
     def next_frame(self):
-        return GameFrame(self.game)
\ No newline at end of file
+        self.game.preloader.pin(self.group)
+        return self.frame_type(self.game)
@@ -0,0 +1,115 @@
+import collections
+import time
+
+import pygame
+
+
+class FrameTimer:
+    """
+    Records how long each phase of a frame takes into a ring buffer, so we can tell what blows the frame budget.
+    Does nothing but call through while disabled.
+    """
+
+    KEY = pygame.K_F3
+    PERCENTILES = (50, 95, 99)
+    OVERLAY_REFRESH = 0.25
+
+    def __init__(self, history=300):
+        self.enabled = False
+        self.history = history
+        self.samples = {}
+
+        self.font = None
+        self.overlay = None
+        self.since_overlay = 0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.overlay = None
+
+    def time(self, name, function, *args):
+        """
+        Calls function with args, recording how long it took under name.
+        :param name: The phase name, like "queue.update"
+        :param function: The function to call
+        :return: Whatever the function returns
+        """
+        if not self.enabled:
+            return function(*args)
+        start = time.perf_counter()
+        result = function(*args)
+        self.record(name, time.perf_counter() - start)
+        return result
+
+    def record(self, name, duration):
+        if name not in self.samples:
+            self.samples[name] = collections.deque(maxlen=self.history)
+        self.samples[name].append(duration)
+
+    def clear(self):
+        self.samples = {}
+
+    def percentiles(self, name):
+        """
+        :param name: The phase name
+        :return: A dict mapping each of PERCENTILES to a duration in seconds
+        """
+        samples = sorted(self.samples.get(name, ()))
+        if not samples:
+            return {p: 0 for p in self.PERCENTILES}
+        return {p: samples[min(len(samples) - 1, len(samples) * p // 100)] for p in self.PERCENTILES}
+
+    def summary(self):
+        return {name: self.percentiles(name) for name in self.samples}
+
+    def report(self):
+        lines = [f"{'phase':<20}" + "".join(f"{'p' + str(p):>9}" for p in self.PERCENTILES)]
+        for name, percentiles in self.summary().items():
+            lines.append(f"{name:<20}" + "".join(f"{percentiles[p]*1000:>7.2f}ms" for p in self.PERCENTILES))
+        return "\n".join(lines)
+
+    def update(self, dt, events):
+        for event in events:
+            if event.type == pygame.KEYDOWN and event.key == self.KEY:
+                self.toggle()
+        self.since_overlay += dt
+
+    def draw(self, surface, offset=(0, 0)):
+        if not self.enabled:
+            return
+        surface.blit(self.current_overlay(), (10 + offset[0], 10 + offset[1]))
+
+    def current_overlay(self):
+        if not self.overlay or self.since_overlay > self.OVERLAY_REFRESH:
+            self.overlay = self.render_overlay()
+            self.since_overlay = 0
+        return self.overlay
+
+    def dirty_regions(self, offset=(0, 0)):
+        """
+        The overlay is translucent and drawn over the frame, so what's under it is redrawn every frame it's up,
+        and once more after it's turned off.
+        """
+        rect = None
+        if self.enabled:
+            rect = pygame.Rect((10 + offset[0], 10 + offset[1]), self.current_overlay().get_size())
+        yield self, rect, None
+
+    def render_overlay(self):
+        if not self.font:
+            self.font = pygame.font.Font("assets/fonts/corbel.ttf", 14)
+        rows = [("phase",) + tuple(f"p{p}" for p in self.PERCENTILES)]
+        for name, percentiles in self.summary().items():
+            rows.append((name,) + tuple(f"{percentiles[p]*1000:.2f}ms" for p in self.PERCENTILES))
+
+        overlay = pygame.Surface((150 + 60 * len(self.PERCENTILES), 16 * len(rows) + 10))
+        overlay.fill((0, 0, 0))
+        overlay.set_alpha(180)
+        y = 5
+        for row in rows:
+            x = 5
+            for i, text in enumerate(row):
+                overlay.blit(self.font.render(text, 1, (255, 255, 255)), (x, y))
+                x += 140 if i == 0 else 60
+            y += 16
+        return overlay
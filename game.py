@@ -2,42 +2,138 @@ import pygame
 
 import constants as c
 import frame as f
+import os
 import sys
+import time
 from sound_manager import SoundManager
 from image_manager import ImageManager
+from font_manager import FontManager
+from preloader import Preloader
+from frame_timer import FrameTimer
 
 class Game:
-    def __init__(self):
+    def __init__(self, headless=False, run=True, dirty_rects=c.DIRTY_RECTS):
+        """
+        :param headless: Use SDL's dummy video and audio drivers, so no window or sound device is needed
+        :param run: Go straight into the blocking main loop
+        :param dirty_rects: Let frames redraw and present only the parts of the screen that changed
+        """
+        self.headless = headless
+        self.dirty_rects = dirty_rects
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
         pygame.init()
         pygame.mixer.set_num_channels(16)
         SoundManager.init()
         ImageManager.init()
+        FontManager.init()
         self.screen = pygame.display.set_mode((c.WINDOW_SIZE))
+        ImageManager.upgrade()
+        self.preloader = Preloader()
         pygame.display.set_caption(c.CAPTION)
 
         self.clock = pygame.time.Clock()
+        self.frame_timer = FrameTimer()
 
         self.lvs = [("SCORE", 0)]
 
-        self.main()
+        if run:
+            self.main()
 
     def main(self):
-        current_frame = f.Title(self)
+        current_frame = f.Loading(self, "title", f.Title)
+        # Everything else decodes in the background while the title is up
+        self.preloader.request(*Preloader.manifest())
         current_frame.load()
         self.clock.tick(60)
 
+        tick = 1/c.TICK_RATE
+        accumulator = 0
+        pending_events = []
         while True:
             dt, events = self.get_events()
-            if dt > 0.05:
-                dt = 0.05
-            current_frame.update(dt, events)
-            current_frame.draw(self.screen, (0, 0))
-            pygame.display.flip()
+            self.frame_timer.update(dt, events)
+            self.preloader.update(c.PRELOAD_STEP_SECONDS)
+            pending_events += events
+            accumulator += dt
+
+            ticks = 0
+            while accumulator >= tick:
+                if ticks == c.MAX_TICKS_PER_FRAME:
+                    # Too far behind to catch up, so let the simulation slow down instead of spiralling
+                    accumulator = 0
+                    break
+                current_frame.store_previous()
+                self.frame_timer.time("update", current_frame.update, tick, pending_events)
+                pending_events = []
+                accumulator -= tick
+                ticks += 1
+
+                if current_frame.done:
+                    current_frame = current_frame.next_frame()
+                    current_frame.load()
+                    accumulator = 0
+
+            self.frame_timer.time("draw", current_frame.draw_interpolated, self.screen, accumulator/tick)
+            self.frame_timer.draw(self.screen)
+            self.present(current_frame)
+
+    def simulate(self, frames=None, seconds=None, dt=1/c.FRAMERATE, render=True):
+        """
+        Runs GameFrame sessions back to back with a fixed timestep and no framerate cap.
+        :param frames: Stop after this many simulated frames
+        :param seconds: Stop after this many wall-clock seconds
+        :param dt: The timestep fed to every update
+        :param render: Draw and flip every frame
+        :return: A dict with the simulated frame count, elapsed wall-clock time, frames per second,
+            the last session's particle counts, and the image and sound caches' stats
+        """
+        self.preloader.finish("game")
+        current_frame = f.GameFrame(self)
+        current_frame.load()
+
+        count = 0
+        start = time.perf_counter()
+        while True:
+            if frames is not None and count >= frames:
+                break
+            if seconds is not None and time.perf_counter() - start >= seconds:
+                break
+
+            events = pygame.event.get()
+            self.frame_timer.time("update", current_frame.update, dt, events)
+            if render:
+                self.frame_timer.time("draw", current_frame.draw, self.screen, (0, 0))
+                self.present(current_frame)
+            count += 1
 
             if current_frame.done:
                 current_frame = current_frame.next_frame()
+                if not isinstance(current_frame, f.GameFrame):
+                    # Nobody is around to press enter on the menus
+                    current_frame = f.GameFrame(self)
                 current_frame.load()
 
+        elapsed = time.perf_counter() - start
+        return {
+            "frames": count,
+            "seconds": elapsed,
+            "fps": count/elapsed if elapsed else 0,
+            "particles": current_frame.particle_manager.stats(),
+            "images": ImageManager.stats(),
+            "sounds": SoundManager.stats(),
+        }
+
+    def present(self, frame):
+        """
+        Shows what was drawn this frame, updating only the frame's changed rects if it reported any.
+        """
+        if frame.updated_rects is None or self.frame_timer.enabled:
+            pygame.display.flip()
+        else:
+            pygame.display.update(frame.updated_rects)
+
     def get_events(self):
         dt = self.clock.tick(c.FRAMERATE)/1000
 
@@ -50,4 +146,4 @@ class Game:
         return dt, events
 
 if __name__=="__main__":
-    Game()
\ No newline at end of file
+    Game()
@@ -0,0 +1,108 @@
+import collections
+
+import pygame
+
+from draw_list import DrawList
+from font_manager import FontManager
+
+
+class GlyphAtlas:
+    """
+    Rendered characters for one font, size and color, packed into a single surface.
+    Characters are rasterized the first time they're drawn, and the least recently used ones are evicted when
+    the atlas fills up. Draw a glyph by blitting the atlas surface with the glyph's area.
+    Evicting overwrites a cell, so blits of the atlas that haven't been made yet, like ones recorded in a
+    DrawList, have to be made first. glyph() takes a flush callback for that.
+    """
+
+    ATLASES = {}
+
+    @staticmethod
+    def get(path, size, color):
+        """
+        Gets the shared atlas for a font, creating it if this is the first time it's asked for.
+        :param path: The path of the font file
+        :param size: The font size
+        :param color: The color to render in
+        """
+        key = (path, size, tuple(color))
+        if key not in GlyphAtlas.ATLASES:
+            GlyphAtlas.ATLASES[key] = GlyphAtlas(path, size, color)
+        return GlyphAtlas.ATLASES[key]
+
+    def __init__(self, path, size, color, capacity=128):
+        """
+        :param capacity: The number of glyphs the atlas surface can hold at once
+        """
+        self.font = FontManager.load(path, size)
+        self.color = color
+
+        self.cell_width = max(self.font.size("W")[0], self.font.get_height())
+        self.cell_height = self.font.get_height()
+        self.columns = 16
+        rows = -(-capacity//self.columns)
+        self.surface = pygame.Surface((self.columns * self.cell_width, rows * self.cell_height), pygame.SRCALPHA)
+        self.free_cells = list(range(self.columns * rows))[::-1]
+
+        self.widths = {}
+        # Character -> (surface, area) in least recently used order
+        self.glyphs = collections.OrderedDict()
+        self.evictions = 0
+
+    def width(self, char):
+        """
+        :return: How far the cursor advances past char, without rasterizing it
+        """
+        if char not in self.widths:
+            self.widths[char] = self.font.size(char)[0]
+        return self.widths[char]
+
+    def glyph(self, char, flush=None):
+        """
+        :param flush: Called with no arguments before a glyph is evicted, to make any pending blits of the atlas
+        :return: A (surface, area) pair to blit for char. The area is None if the glyph didn't fit in a cell.
+        """
+        if char in self.glyphs:
+            self.glyphs.move_to_end(char)
+            return self.glyphs[char]
+
+        if not self.width(char):
+            rendered = pygame.Surface((0, self.cell_height), pygame.SRCALPHA)
+        else:
+            rendered = self.font.render(char, 1, self.color)
+
+        if rendered.get_width() > self.cell_width or rendered.get_height() > self.cell_height:
+            # Too wide for a cell, so it gets a surface of its own
+            glyph = (rendered, None)
+        else:
+            area = self.allocate(flush)
+            # The cell is empty, so taking the max copies the glyph without blending its edges into black
+            self.surface.blit(rendered, area.topleft, special_flags=pygame.BLEND_RGBA_MAX)
+            glyph = (self.surface, pygame.Rect(area.topleft, rendered.get_size()))
+        self.glyphs[char] = glyph
+        return glyph
+
+    def allocate(self, flush=None):
+        if not self.free_cells:
+            if flush:
+                flush()
+            self.evict()
+        cell = self.free_cells.pop()
+        x = (cell % self.columns) * self.cell_width
+        y = (cell // self.columns) * self.cell_height
+        return pygame.Rect(x, y, self.cell_width, self.cell_height)
+
+    def evict(self):
+        # Glyphs with their own surfaces don't free a cell, so keep going until one does
+        while not self.free_cells:
+            char, (surface, area) = self.glyphs.popitem(last=False)
+            self.evictions += 1
+            if area is None:
+                continue
+            self.surface.fill((0, 0, 0, 0), (area.x, area.y, self.cell_width, self.cell_height))
+            cell = (area.y // self.cell_height) * self.columns + area.x // self.cell_width
+            self.free_cells.append(cell)
+
+    def blit(self, surface, char, position):
+        glyph, area = self.glyph(char, lambda: DrawList.submit_pending(surface))
+        surface.blit(glyph, position, area)
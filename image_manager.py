@@ -1,4 +1,12 @@
+import time
+
+import os
+
 import pygame
+import yaml
+
+import constants as c
+from asset_budget import AssetBudget
 
 
 class ImageManager:
@@ -9,10 +17,134 @@ class ImageManager:
     initialized = False
     sounds = None
 
+    # Paths whose surfaces were loaded before the display existed, so still have the file's pixel format
+    pending = None
+
+    # Transformed copies of loaded images, by path and the chain of transforms applied to them
+    derived = None
+
+    # Keeps images and their copies under c.IMAGE_CACHE_BYTES, keyed by path or by (path, chain).
+    # Surfaces other caches make from images are charged to it too.
+    budget = None
+
+    # For each surface charged by another cache, the surface it was made from, and how to drop it from that cache
+    charged = None
+
+    # The keys of the charged surfaces made from each surface
+    charged_from = None
+
+    # Where bake.py writes copies of images transformed ahead of time, in a directory per window size
+    BAKED_DIRECTORY = "assets/baked"
+
+    # The baked copies for this window size, by image path, as written to the directory's index by bake.py
+    baked = None
+
+    # The transforms load_transformed can chain, by name
+    TRANSFORMS = {
+        "scale": pygame.transform.scale,
+        "rotate": pygame.transform.rotate,
+    }
+
+    # Colors tried, in order, as the colorkey for images that are stored keyed
+    KEY_COLORS = ((255, 0, 255), (0, 255, 255), (255, 255, 0))
+
     @staticmethod
     def init():
         ImageManager.initialized = True
         ImageManager.sounds = {}
+        ImageManager.derived = {}
+        ImageManager.pending = set()
+        ImageManager.budget = AssetBudget(c.IMAGE_CACHE_BYTES)
+        ImageManager.charged = {}
+        ImageManager.charged_from = {}
+        ImageManager.baked = ImageManager.load_baked_index(c.WINDOW_SIZE)
+
+    @staticmethod
+    def baked_directory(size):
+        return os.path.join(ImageManager.BAKED_DIRECTORY, f"{size[0]}x{size[1]}")
+
+    @staticmethod
+    def load_baked_index(size):
+        """
+        :param size: The window size the copies were baked for
+        :return: {path: {"size": (width, height), "variants": {chain: baked file path}}}, empty if nothing was baked.
+            Images changed since they were baked are left out, so they're loaded and transformed as usual.
+        """
+        path = os.path.join(ImageManager.baked_directory(size), "index.yaml")
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            index = yaml.safe_load(f.read()) or {}
+        index = {
+            image: entry for image, entry in index.items()
+            if entry.get("source") == ImageManager.source_stamp(image)
+        }
+        return {
+            image: {
+                "size": tuple(entry["size"]),
+                "variants": {
+                    ImageManager.chain_from_lists(variant["chain"]):
+                        os.path.join(ImageManager.baked_directory(size), variant["file"])
+                    for variant in entry["variants"]
+                },
+            }
+            for image, entry in index.items()
+        }
+
+    @staticmethod
+    def source_stamp(path):
+        """
+        :return: What bake.py records about an image to tell later whether it's changed, or None if it's missing
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return {"mtime_ns": stat.st_mtime_ns, "bytes": stat.st_size}
+
+    @staticmethod
+    def chain_from_lists(chain):
+        """
+        YAML has no tuples, so turns a chain read from it back into the hashable form load_transformed uses.
+        """
+        return tuple((name, tuple(argument) if isinstance(argument, list) else argument) for name, argument in chain)
+
+    @staticmethod
+    def baked_file(path, chain):
+        """
+        :return: The file bake.py wrote for this image and chain, or None if it wasn't baked.
+            With an empty chain, that's a copy of the image itself, baked because it's drawn at its own size.
+        """
+        ImageManager.check_initialized()
+        return ImageManager.baked.get(path, {}).get("variants", {}).get(chain)
+
+    @staticmethod
+    def forget_baked(path, chain):
+        """
+        Stops using a baked copy, like one that failed to load, so it's made from the image instead.
+        """
+        ImageManager.check_initialized()
+        ImageManager.baked.get(path, {}).get("variants", {}).pop(chain, None)
+
+    @staticmethod
+    def cached(path, chain=()):
+        """
+        :return: Whether the image, or its copy transformed by chain, is in the cache
+        """
+        ImageManager.check_initialized()
+        return (path, chain) in ImageManager.derived if chain else path in ImageManager.sounds
+
+    @staticmethod
+    def size(path):
+        """
+        Gets an image's own size without decoding it, if it's been baked.
+        :param path: The path of the image
+        :return: Its (width, height)
+        """
+        ImageManager.check_initialized()
+        if path in ImageManager.baked:
+            return ImageManager.baked[path]["size"]
+        return ImageManager.load(path).get_size()
 
     @staticmethod
     def check_initialized():
@@ -27,8 +159,9 @@ class ImageManager:
         :return:
         """
         ImageManager.check_initialized()
-        if path in ImageManager.sounds:
-            del ImageManager.sounds[path]
+        ImageManager.forget(path)
+        ImageManager.budget.remove(path)
+        ImageManager.clear_derived(path)
 
     @staticmethod
     def clear_all():
@@ -36,7 +169,137 @@ class ImageManager:
         Forgets everything
         """
         ImageManager.check_initialized()
+        for key in list(ImageManager.charged):
+            ImageManager.discharge(key)
         ImageManager.sounds = {}
+        ImageManager.derived = {}
+        ImageManager.pending = set()
+        ImageManager.budget.clear()
+
+    @staticmethod
+    def clear_derived(path):
+        """
+        Forgets every transformed copy of one image, keeping the image itself.
+        """
+        for key in [key for key in ImageManager.derived if key[0] == path]:
+            ImageManager.forget(key)
+            ImageManager.budget.remove(key)
+
+    @staticmethod
+    def pin(*paths):
+        """
+        Keeps images, and every transformed copy of them, from being evicted to stay under budget.
+        :param paths: The paths of the images
+        """
+        ImageManager.check_initialized()
+        for path in paths:
+            ImageManager.budget.pin(path)
+
+    @staticmethod
+    def unpin(*paths):
+        ImageManager.check_initialized()
+        for path in paths:
+            ImageManager.budget.unpin(path)
+
+    @staticmethod
+    def unpin_all():
+        ImageManager.check_initialized()
+        ImageManager.budget.pinned.clear()
+
+    @staticmethod
+    def stats():
+        """
+        :return: Hits, misses, evictions, resident bytes and load time per path. The resident bytes include the
+            surfaces charged by other caches, which are also reported on their own.
+        """
+        ImageManager.check_initialized()
+        return ImageManager.budget.stats()
+
+    @staticmethod
+    def store(key, path, surface, seconds):
+        """
+        Caches a freshly made surface under key and evicts whatever's needed to get back under budget.
+        :param seconds: How long making it took
+        """
+        table = ImageManager.derived if isinstance(key, tuple) else ImageManager.sounds
+        table[key] = surface
+        ImageManager.budget.add(key, path, ImageManager.surface_bytes(surface), seconds)
+        ImageManager.evict()
+
+    @staticmethod
+    def evict():
+        for evicted in ImageManager.budget.evict():
+            if evicted in ImageManager.charged:
+                ImageManager.discharge(evicted)
+            else:
+                ImageManager.forget(evicted)
+
+    @staticmethod
+    def forget(key):
+        """
+        Drops an image or transformed copy from its table, along with everything charged that was made from it,
+        so nothing keeps it alive. Leaves the budget to the caller.
+        """
+        if key in ImageManager.derived:
+            surface = ImageManager.derived.pop(key)
+        elif key in ImageManager.sounds:
+            surface = ImageManager.sounds.pop(key)
+            ImageManager.pending.discard(key)
+        else:
+            return
+        ImageManager.discharge_from(surface)
+
+    @staticmethod
+    def charge(key, source, surface, discard):
+        """
+        Counts a surface another cache made against the image budget, so it's evicted along with everything else.
+        :param key: A key for the surface, unique across every cache that charges
+        :param source: The surface it was made from. If that's evicted, this is dropped too.
+        :param surface: The surface being charged for
+        :param discard: Called with no arguments to drop the surface from the other cache
+        """
+        ImageManager.check_initialized()
+        ImageManager.charged[key] = source, discard
+        ImageManager.charged_from.setdefault(source, set()).add(key)
+        ImageManager.budget.charge(key, ImageManager.surface_bytes(surface))
+        ImageManager.evict()
+
+    @staticmethod
+    def touch(key):
+        """
+        Marks a charged surface as just used.
+        """
+        ImageManager.budget.touch(key)
+
+    @staticmethod
+    def discharge(key):
+        """
+        Drops a charged surface from the budget and from the cache that charged it, along with anything
+        charged that was made from it in turn.
+        :param key: The key it was charged under
+        """
+        if key not in ImageManager.charged:
+            return
+        source, discard = ImageManager.charged.pop(key)
+        keys = ImageManager.charged_from.get(source)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del ImageManager.charged_from[source]
+        ImageManager.budget.remove(key)
+        discard()
+
+    @staticmethod
+    def discharge_from(surface):
+        """
+        Drops everything charged that was made from surface.
+        """
+        for key in list(ImageManager.charged_from.get(surface, ())):
+            ImageManager.discharge(key)
+
+    @staticmethod
+    def surface_bytes(surface):
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
 
     @staticmethod
     def load(path):
@@ -47,11 +310,177 @@ class ImageManager:
         """
         ImageManager.check_initialized()
         if path in ImageManager.sounds:
+            ImageManager.budget.hit(path)
             return ImageManager.sounds[path]
-        sound = pygame.image.load(path)
-        ImageManager.sounds[path] = sound
-        return sound
+        started = time.perf_counter()
+        sound = pygame.image.load(ImageManager.baked_file(path, ()) or path)
+        return ImageManager.add_decoded(path, sound, time.perf_counter() - started)
+
+    @staticmethod
+    def add_decoded(path, surface, seconds=0, chain=None):
+        """
+        Caches an image that was decoded somewhere else, like on a preloading thread, converting it here.
+        :param path: The path of the image
+        :param surface: The surface straight from pygame.image.load
+        :param seconds: How long decoding it took
+        :param chain: If surface is a baked copy, the chain it was baked with. An empty chain is the image itself.
+        :return: The cached surface, or the one already cached
+        """
+        ImageManager.check_initialized()
+        key = (path, chain) if chain else path
+        table = ImageManager.derived if chain else ImageManager.sounds
+        if key in table:
+            return table[key]
+        started = time.perf_counter()
+        if pygame.display.get_surface():
+            surface = ImageManager.normalize(surface)
+        else:
+            ImageManager.pending.add(path)
+        ImageManager.store(key, path, surface, seconds + time.perf_counter() - started)
+        return surface
 
     @staticmethod
     def load_copy(path):
         return ImageManager.load(path).copy()
+
+    @staticmethod
+    def load_transformed(path, chain):
+        """
+        Loads a transformed copy of an image from cache, or from the copy bake.py made for this window size,
+        or otherwise makes it from the image.
+        :param path: The path of the image
+        :param chain: A tuple of transforms applied in order, each a tuple of a name from
+            ImageManager.TRANSFORMS and its argument, like (("rotate", 90), ("scale", (32, 32)))
+        :return: The transformed surface. Like load, it's shared with everything else asking for the same chain.
+        """
+        ImageManager.check_initialized()
+        key = (path, chain)
+        if key in ImageManager.derived:
+            ImageManager.budget.hit(key)
+            return ImageManager.derived[key]
+        started = time.perf_counter()
+        baked = ImageManager.baked_file(path, chain)
+        if baked:
+            return ImageManager.add_decoded(path, pygame.image.load(baked), time.perf_counter() - started, chain)
+        surface = ImageManager.load(path)
+        started = time.perf_counter()
+        for name, argument in chain:
+            surface = ImageManager.TRANSFORMS[name](surface, argument)
+        ImageManager.accelerate(surface)
+        ImageManager.store(key, path, surface, time.perf_counter() - started)
+        return surface
+
+    @staticmethod
+    def load_scaled(path, size):
+        """
+        :param path: The path of the image
+        :param size: The (width, height) to scale to, truncated to whole pixels like pygame.transform.scale does
+        :return: The scaled surface, shared like load's
+        """
+        size = int(size[0]), int(size[1])
+        if size == ImageManager.size(path):
+            return ImageManager.load(path)
+        return ImageManager.load_transformed(path, (("scale", size),))
+
+    @staticmethod
+    def load_rotated(path, angle):
+        """
+        :param path: The path of the image
+        :param angle: The angle to rotate counterclockwise by, in degrees
+        :return: The rotated surface, shared like load's
+        """
+        angle = angle % 360
+        if angle == 0:
+            return ImageManager.load(path)
+        return ImageManager.load_transformed(path, (("rotate", angle),))
+
+    @staticmethod
+    def upgrade():
+        """
+        Normalizes everything loaded before the display was set up. Call it right after pygame.display.set_mode.
+        Only later loads get the upgraded surfaces; anything already holding one of the old ones keeps it.
+        """
+        ImageManager.check_initialized()
+        if not pygame.display.get_surface():
+            return
+        for path in ImageManager.pending:
+            if path in ImageManager.sounds:
+                ImageManager.discharge_from(ImageManager.sounds[path])
+                ImageManager.sounds[path] = ImageManager.normalize(ImageManager.sounds[path])
+                ImageManager.budget.resize(path, ImageManager.surface_bytes(ImageManager.sounds[path]))
+            ImageManager.clear_derived(path)
+        ImageManager.pending = set()
+
+    @staticmethod
+    def normalize(surface):
+        """
+        Converts a freshly loaded surface to the display's pixel format, so blitting it needs no conversion.
+        Images saved with a colorkey are stored opaque with a colorkey, images with any other transparency keep
+        per-pixel alpha, and the rest are stored opaque. Anything with transparency is run-length encoded,
+        which lets blits skip clear runs.
+        :param surface: A surface straight from pygame.image.load
+        :return: The converted surface
+        """
+        if surface.get_colorkey() is not None:
+            keyed = ImageManager.keyed(surface)
+            if keyed:
+                return keyed
+        if not ImageManager.transparent(surface):
+            return surface.convert()
+        return ImageManager.accelerate(surface.convert_alpha())
+
+    @staticmethod
+    def accelerate(surface):
+        """
+        Run-length encodes a surface with transparency, which transforms don't carry over to their results.
+        :return: The same surface
+        """
+        colorkey = surface.get_colorkey()
+        if colorkey is not None:
+            surface.set_colorkey(colorkey, pygame.RLEACCEL)
+        elif surface.get_flags() & pygame.SRCALPHA:
+            surface.set_alpha(255, pygame.RLEACCEL)
+        return surface
+
+    @staticmethod
+    def unencoded(surface):
+        """
+        SDL blends run-length encoded alpha surfaces wrongly onto destinations that have per-pixel alpha
+        themselves, so those destinations need a copy without the encoding.
+        :return: surface, or a copy of it that isn't run-length encoded
+        """
+        if not surface.get_flags() & pygame.RLEACCELOK or not surface.get_flags() & pygame.SRCALPHA:
+            return surface
+        copy = surface.copy()
+        copy.set_alpha(255)
+        return copy
+
+    @staticmethod
+    def keyed(surface):
+        """
+        Paletted images key out a palette index rather than a color, so other pixels may share the key's color.
+        The key is moved to a color no visible pixel uses.
+        :return: The opaque surface with its new colorkey, or None if every candidate color is in use
+        """
+        with_alpha = surface.convert_alpha()
+        opaque = pygame.mask.from_surface(with_alpha, 254)
+        for key in ImageManager.KEY_COLORS:
+            if pygame.mask.from_threshold(with_alpha, key, (1, 1, 1, 255)).overlap_area(opaque, (0, 0)):
+                continue
+            keyed = pygame.Surface(surface.get_size()).convert()
+            keyed.fill(key)
+            keyed.blit(with_alpha, (0, 0))
+            keyed.set_colorkey(key)
+            return ImageManager.accelerate(keyed)
+        return None
+
+    @staticmethod
+    def transparent(surface):
+        """
+        :return: Whether any pixel of surface is less than fully opaque
+        """
+        if not surface.get_flags() & pygame.SRCALPHA and surface.get_colorkey() is None:
+            return False
+        opaque = pygame.mask.from_surface(surface, 254)
+        return opaque.count() < surface.get_width() * surface.get_height()
+
@@ -69,8 +69,12 @@ class Ingredient:
 
 
     @staticmethod
-    def get_surf(key):
+    def get_path(key):
         Ingredient.load_spices_from_yaml()
         if (not key in Ingredient.ingredient_dict) or (not "image" in Ingredient.ingredient_dict[key]):
-            return ImageManager.load("pyracy/TestSprite.png")
-        return ImageManager.load(Ingredient.ingredient_dict[key]["image"])
\ No newline at end of file
+            return "pyracy/TestSprite.png"
+        return Ingredient.ingredient_dict[key]["image"]
+
+    @staticmethod
+    def get_surf(key):
+        return ImageManager.load(Ingredient.get_path(key))
\ No newline at end of file
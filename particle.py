@@ -1,18 +1,26 @@
 from primitives import Pose
 from ingredient import Ingredient
 from image_manager import ImageManager
+from font_manager import FontManager
 import constants as c
 import math
 import random
 import pygame
 
 from sound_manager import SoundManager
+from transform_cache import RotationCache, ScaleCache, OpacityCache
+from animation_strip import AnimationStrip
+from particle_pool import ParticlePool
+from tint_compositor import TintCompositor
 
 
 class Particle:
 
     food = False
 
+    # Under budget pressure, particles with lower priority are culled first
+    priority = 1
+
     def __init__(self, position=(0, 0), velocity=(0, 0), duration=1):
         self.position = Pose(position)
         self.velocity = Pose(velocity)
@@ -20,6 +28,19 @@ class Particle:
         self.duration = duration
         self.age = 0
 
+    @classmethod
+    def create(cls, *args, **kwargs):
+        """
+        Makes a particle of this type, reusing an expired one from the pool if there is one.
+        Takes the same arguments as the constructor.
+        """
+        return ParticlePool.acquire(cls, *args, **kwargs)
+
+    def reset(self, *args, **kwargs):
+        """
+        Puts a recycled particle back in the state it would be in if it had just been constructed.
+        """
+        self.__init__(*args, **kwargs)
 
     def update(self, dt, events):
         if self.destroyed:
@@ -36,13 +57,27 @@ class Particle:
     def through(self):
         return min(0.999, self.age/self.duration)
 
+    def get_rect(self, offset=(0, 0)):
+        """
+        :return: The screen area this particle draws to, or None if it doesn't draw
+        """
+        return None
+
+    def dirty_regions(self, offset=(0, 0)):
+        yield self, self.get_rect(offset), None
+
     def destroy(self):
         self.destroyed = True
 
 
 class FoodParticle(Particle):
+
+    priority = 3
+    PLOPS = None
+
     def __init__(self, key, frame):
-        self.surf = pygame.transform.scale(Ingredient.get_surf(key), (160, 160))
+        # Shared with every other particle of the same ingredient, so its rotations are cached once
+        self.surf = ImageManager.load_scaled(Ingredient.get_path(key), (160, 160))
         self.food = True
 
         super().__init__(duration=5)
@@ -51,17 +86,26 @@ class FoodParticle(Particle):
         self.acceleration = Pose((0, 5000))
         self.splattered = False
         self.frame = frame
-        self.plops = [SoundManager.load(f"assets/sounds/item plop_{x}.wav") for x in range(1, 15)]
-        for plop in self.plops:
-            plop.set_volume(0.7)
+        if not FoodParticle.PLOPS:
+            FoodParticle.PLOPS = [SoundManager.load(f"assets/sounds/item plop_{x}.wav") for x in range(1, 15)]
+            for plop in FoodParticle.PLOPS:
+                plop.set_volume(0.7)
+        self.plops = FoodParticle.PLOPS
 
     def draw(self, surface, offset=(0, 0)):
-        surf = pygame.transform.rotate(self.surf, self.position.angle*180/math.pi)
+        surf = RotationCache.rotate(self.surf, self.position.angle*180/math.pi)
 
         x = self.position.x + offset[0] - surf.get_width()//2
         y = self.position.y + offset[1] - surf.get_height()//2
         surface.blit(surf, (x, y))
 
+    def get_rect(self, offset=(0, 0)):
+        # Big enough for the surface at any rotation
+        size = math.ceil(self.surf.get_width() * math.sqrt(2))
+        rect = pygame.Rect(0, 0, size, size)
+        rect.center = self.position.x + offset[0], self.position.y + offset[1]
+        return rect
+
     def update(self, dt, events):
         self.velocity += self.acceleration*dt
         if self.position.y < c.WINDOW_HEIGHT*0.60:
@@ -72,11 +116,13 @@ class FoodParticle(Particle):
                 self.splattered = True
                 random.choice(self.plops).play()
                 for i in range(20):
-                    self.frame.particles.append(SplatterParticle(self.position.get_position()))
+                    self.frame.add_particle(SplatterParticle.create(self.position.get_position()))
 
 class PoofParticle(Particle):
+
+    STRIP = None
+
     def __init__(self, position, color=255):
-        self.surf = ImageManager.load("assets/images/smoke particle.png")
         super().__init__(duration=1.0, position=position)
         speed = random.random()**2 * 800 + 500
         angle = random.random() * math.pi*2
@@ -84,17 +130,43 @@ class PoofParticle(Particle):
         self.age += 0.8*random.random()
         self.angle = random.random() * 360
 
-    def draw(self, surf, offset=(0, 0)):
-        size = 100 * (1 - self.through())
-        surface = pygame.transform.rotate(self.surf, self.angle)
+    @staticmethod
+    def strip():
+        if not PoofParticle.STRIP:
+            PoofParticle.STRIP = AnimationStrip(PoofParticle.render, c.POOF_FRAMES, c.POOF_ROTATIONS)
+        return PoofParticle.STRIP
+
+    @staticmethod
+    def bake():
+        """
+        Renders every frame of the smoke puff ahead of time, so none are rendered during play.
+        """
+        PoofParticle.strip().bake()
+
+    @staticmethod
+    def render(variant, through):
+        angle = variant * 360/c.POOF_ROTATIONS
+        size = 100 * (1 - through)
+        surface = pygame.transform.rotate(ImageManager.load("assets/images/smoke particle.png"), angle)
         surface = pygame.transform.scale(surface, (size, size))
+        surface.set_alpha(255 * (1 - through))
+        surface.set_colorkey((255, 0, 255))
+        return surface
 
+    def current_surf(self):
+        return PoofParticle.strip().surface(round(self.angle * c.POOF_ROTATIONS/360), self.through())
+
+    def draw(self, surf, offset=(0, 0)):
+        surface = self.current_surf()
         x = self.position.x - surface.get_width()//2
         y = self.position.y - surface.get_height()//2
-        surface.set_alpha(255 * (1 - self.through()))
-        surface.set_colorkey((255, 0, 255))
         surf.blit(surface, (x, y))
 
+    def get_rect(self, offset=(0, 0)):
+        rect = self.current_surf().get_rect().inflate(2, 2)
+        rect.center = self.position.get_position()
+        return rect
+
     def update(self, dt, events):
         super().update(dt, events)
         self.velocity *= 0.0005**dt
@@ -108,6 +180,9 @@ class PanPoof(PoofParticle):
             self.velocity.y = -20
 
 class SplatterParticle(Particle):
+
+    priority = 0
+
     def __init__(self, position):
         super().__init__(duration=0.45, position=position)
         self.velocity = Pose((0, 0))
@@ -118,6 +193,11 @@ class SplatterParticle(Particle):
     def draw(self, surf, offset=(0, 0)):
         pygame.draw.circle(surf, (255, 255, 255), self.position.get_position(), 6 * (1 - self.through()))
 
+    def get_rect(self, offset=(0, 0)):
+        rect = pygame.Rect(0, 0, 14, 14)
+        rect.center = self.position.get_position()
+        return rect
+
     def update(self, dt, events):
         super().update(dt, events)
         self.velocity.y += 4000*dt
@@ -125,6 +205,8 @@ class SplatterParticle(Particle):
 
 class ReactionParticle(Particle):
 
+    priority = 2
+
     def __init__(self, position, score):
         self.score = score
         velocity = (0, -50)
@@ -140,38 +222,52 @@ class ReactionParticle(Particle):
 
     def draw(self, surface, offset=(0, 0)):
         if self.score == 2:
-            copy = pygame.transform.scale2x(self.surf)
+            copy = ScaleCache.fetch((self.surf, "2x"), lambda: pygame.transform.scale2x(self.surf))
             w = copy.get_width()
             h = copy.get_height()
             x = self.position.x - w // 2 + offset[0]
             y = self.position.y - h // 2 + offset[1]
-            copy.set_alpha(100 * (1 - self.through()))
-            surface.blit(copy, (x, y))
+            OpacityCache.blit(surface, copy, (x, y), 100 * (1 - self.through()))
 
         surf = self.surf
         w = surf.get_width()
         h = surf.get_height()
         x = self.position.x - w//2 + offset[0]
         y = self.position.y - h//2 + offset[1]
-        surf.set_alpha(255 * (1 - self.through()))
-        surface.blit(surf, (x, y))
+        OpacityCache.blit(surface, surf, (x, y), 255 * (1 - self.through()))
+
+    def get_rect(self, offset=(0, 0)):
+        scale = 2 if self.score == 2 else 1
+        rect = pygame.Rect(0, 0, self.surf.get_width() * scale + 2, self.surf.get_height() * scale + 2)
+        rect.center = self.position.x + offset[0], self.position.y + offset[1]
+        return rect
 
 
 class TintParticle(Particle):
 
+    priority = 3
+
     def __init__(self, duration=0.25, color=(0, 0, 0), opacity=255):
         super().__init__(duration=duration)
-        surf = pygame.Surface((c.WINDOW_SIZE))
-        surf.fill((color))
-        self.surf = surf
+        self.color = color
         self.opacity = opacity
 
+    def tint(self):
+        """
+        :return: The color and alpha to tint the screen with right now
+        """
+        return self.color, self.opacity - self.opacity*self.through()
+
     def draw(self, surf, offset=(0, 0)):
-        self.surf.set_alpha((self.opacity - self.opacity*self.through()))
-        surf.blit(self.surf, (0, 0))
+        TintCompositor.blend(surf, *self.tint())
+
+    def get_rect(self, offset=(0, 0)):
+        return pygame.Rect(0, 0, c.WINDOW_WIDTH, c.WINDOW_HEIGHT)
 
 
 class LifeParticle(Particle):
+
+    priority = 3
     FONT = None
 
     def __init__(self, duration=1, lives=3):
@@ -179,9 +275,6 @@ class LifeParticle(Particle):
         self.full = ImageManager.load("assets/images/life.png")
         self.empty = ImageManager.load("assets/images/life_empty.png")
         self.lives = lives
-        self.banner = pygame.Surface((c.WINDOW_WIDTH, 1))
-        self.banner.fill((0, 0, 0))
-        self.banner.set_alpha(128)
 
         self.buzzer = SoundManager.load("assets/sounds/end buzzer.wav")
         self.buzzer.set_volume(0.2)
@@ -189,7 +282,7 @@ class LifeParticle(Particle):
             self.buzzer.play()
 
         if not LifeParticle.FONT:
-            LifeParticle.FONT = pygame.font.Font("assets/fonts/AllTheWayToTheSun.ttf", 55)
+            LifeParticle.FONT = FontManager.load("assets/fonts/AllTheWayToTheSun.ttf", 55)
 
 
         if self.lives < 0:
@@ -198,10 +291,8 @@ class LifeParticle(Particle):
             self.text = LifeParticle.FONT.render("LIFE LOST!", 1, (255, 255, 255))
 
     def draw(self, surf, offset=(0, 0)):
-
-
-        banner = pygame.transform.scale(self.banner, (c.WINDOW_WIDTH, min(200, 800*(1-self.through()))))
-        surf.blit(banner, (c.WINDOW_WIDTH//2 - banner.get_width()//2, c.WINDOW_HEIGHT//2 - banner.get_height()//2))
+        banner_height = int(min(200, 800*(1-self.through())))
+        TintCompositor.blend(surf, (0, 0, 0), 128, (0, c.WINDOW_HEIGHT//2 - banner_height//2, c.WINDOW_WIDTH, banner_height))
 
         if self.through() < 0.75:
             alpha = 255
@@ -221,11 +312,15 @@ class LifeParticle(Particle):
         x = c.WINDOW_WIDTH//2 - width//2
         y = c.WINDOW_HEIGHT//2 - self.full.get_height()//2 + 30
 
-        self.full.set_alpha(alpha)
-        self.empty.set_alpha(alpha)
         for i in range(3)[::-1]:
             if i >= (3 - self.lives):
-                surf.blit(self.full, (x, y))
+                OpacityCache.blit(surf, self.full, (x, y), alpha)
             else:
-                surf.blit(self.empty, (x, y))
-            x += spacing + self.full.get_width()
\ No newline at end of file
+                OpacityCache.blit(surf, self.empty, (x, y), alpha)
+            x += spacing + self.full.get_width()
+
+    def get_rect(self, offset=(0, 0)):
+        # The banner, the text above it and the lives below it
+        top = min(c.WINDOW_HEIGHT//2 - 100, c.WINDOW_HEIGHT//2 - self.text.get_height()//2 - 57)
+        bottom = max(c.WINDOW_HEIGHT//2 + 100, c.WINDOW_HEIGHT//2 + self.full.get_height()//2 + 30)
+        return pygame.Rect(0, top, c.WINDOW_WIDTH, bottom - top + 1)
\ No newline at end of file
@@ -0,0 +1,237 @@
+import pygame
+
+import constants as c
+from particle import SplatterParticle, PoofParticle, PanPoof
+from viewport import Viewport
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class ParticleEngine:
+    """
+    Splatter and smoke particles kept as rows of NumPy arrays instead of objects, so a whole batch moves,
+    expires and draws in one pass. Particles are still created through their classes and then adopted,
+    which copies their state in and lets the object go.
+    """
+
+    SPLATTER = 0
+    POOF = 1
+    PAN_POOF = 2
+
+    KINDS = {
+        SplatterParticle: SPLATTER,
+        PoofParticle: POOF,
+        PanPoof: PAN_POOF,
+    }
+
+    # Splatter circles for each whole radius they can be drawn at
+    CIRCLES = None
+
+    @staticmethod
+    def available():
+        """
+        :return: Whether NumPy is installed, which the engine needs
+        """
+        return numpy is not None
+
+    def __init__(self, capacity=256, budget=None):
+        """
+        :param capacity: How many particles to make room for up front
+        :param budget: The most particles to hold at once, or None for no limit
+        """
+        self.count = 0
+        self.budget = budget
+        self.peak = 0
+        self.culled = 0
+        self.position = numpy.zeros((capacity, 2))
+        self.previous = numpy.zeros((capacity, 2))
+        self.velocity = numpy.zeros((capacity, 2))
+        self.age = numpy.zeros(capacity)
+        self.duration = numpy.ones(capacity)
+        self.angle = numpy.zeros(capacity)
+        self.kind = numpy.zeros(capacity, dtype=numpy.int8)
+
+        # How far between the previous tick and this one to draw, set while drawing interpolated
+        self.weight = 1
+
+        if not ParticleEngine.CIRCLES:
+            ParticleEngine.CIRCLES = ParticleEngine.render_circles(6)
+
+    @staticmethod
+    def render_circles(max_radius):
+        circles = [None]
+        for radius in range(1, max_radius + 1):
+            circle = pygame.Surface((radius*2 + 2, radius*2 + 2))
+            circle.set_colorkey((0, 0, 0))
+            pygame.draw.circle(circle, (255, 255, 255), (radius, radius), radius)
+            circles.append(circle)
+        return circles
+
+    def arrays(self):
+        return self.position, self.previous, self.velocity, self.age, self.duration, self.angle, self.kind
+
+    def accepts(self, particle):
+        """
+        :return: Whether particle is a kind the engine simulates
+        """
+        return type(particle) in ParticleEngine.KINDS
+
+    def adopt(self, particle):
+        """
+        Takes over a particle if it's a kind the engine simulates. Over budget, the oldest particle of the
+        lowest priority is culled to make room, or the new one is dropped if everything else matters more.
+        :param particle: A freshly created particle
+        :return: Whether it was adopted. Either way, the object itself is no longer needed if accepts() is true.
+        """
+        kind = ParticleEngine.KINDS.get(type(particle))
+        if kind is None or particle.destroyed:
+            return False
+
+        if self.budget is not None and self.count >= self.budget and not self.make_room(particle.priority):
+            self.culled += 1
+            return False
+        if self.count == len(self.age):
+            self.grow()
+        i = self.count
+        self.position[i] = particle.position.x, particle.position.y
+        self.previous[i] = self.position[i]
+        self.velocity[i] = particle.velocity.x, particle.velocity.y
+        self.age[i] = particle.age
+        self.duration[i] = particle.duration
+        self.angle[i] = getattr(particle, "angle", 0)
+        self.kind[i] = kind
+        self.count += 1
+        self.peak = max(self.peak, self.count)
+        return True
+
+    def make_room(self, priority):
+        by_kind = sorted(ParticleEngine.KINDS.items(), key=lambda item: item[1])
+        priorities = numpy.array([particle_type.priority for particle_type, kind in by_kind])[self.kind[:self.count]]
+        lowest = priorities.min()
+        if lowest > priority:
+            return False
+        keep = numpy.ones(self.count, dtype=bool)
+        keep[numpy.argmax(priorities == lowest)] = False
+        self.compact(keep)
+        self.culled += 1
+        return True
+
+    def grow(self):
+        self.position, self.previous, self.velocity, self.age, self.duration, self.angle, self.kind = [
+            numpy.concatenate((array, numpy.zeros_like(array))) for array in self.arrays()
+        ]
+
+    def update(self, dt):
+        n = self.count
+        if not n:
+            return
+        position = self.position[:n]
+        velocity = self.velocity[:n]
+        age = self.age[:n]
+        kind = self.kind[:n]
+
+        position += velocity * dt
+        expired = age > self.duration[:n]
+        age += dt
+
+        splatter = kind == ParticleEngine.SPLATTER
+        velocity[splatter, 1] += 4000*dt
+        smoke = ~splatter
+        velocity[smoke] *= 0.0005**dt
+        self.angle[:n][smoke] += 45*dt
+        rising = (kind == ParticleEngine.PAN_POOF) & (velocity[:, 1] > -20)
+        velocity[rising, 1] = -20
+
+        if expired.any():
+            self.compact(~expired)
+
+    def compact(self, keep):
+        """
+        Removes every particle that isn't kept in one go, leaving the rest in order.
+        :param keep: A boolean array over the current particles
+        """
+        indices = numpy.flatnonzero(keep)
+        for array in self.arrays():
+            array[:len(indices)] = array[indices]
+        self.count = len(indices)
+
+    def clear(self):
+        self.count = 0
+
+    def stats(self):
+        return {"current": self.count, "peak": self.peak, "culled": self.culled, "budget": self.budget}
+
+    def store_previous(self):
+        self.previous[:self.count] = self.position[:self.count]
+
+    def positions(self):
+        n = self.count
+        if self.weight == 1:
+            return self.position[:n]
+        return self.previous[:n] + (self.position[:n] - self.previous[:n]) * self.weight
+
+    def draw(self, surface, offset=(0, 0)):
+        n = self.count
+        if not n:
+            return
+        position = self.positions()
+        through = numpy.minimum(0.999, self.age[:n]/self.duration[:n])
+        kind = self.kind[:n]
+
+        radius = (6 * (1 - through)).astype(int)
+        strip = PoofParticle.strip()
+        variant = numpy.round(self.angle[:n] * c.POOF_ROTATIONS/360).astype(int) % c.POOF_ROTATIONS
+        frame = numpy.minimum((through * strip.frames).astype(int), strip.frames - 1)
+
+        visible = self.visible(position)
+        Viewport.count("batched particles", int(visible.sum()), int(n - visible.sum()))
+        position = position[visible]
+
+        circles = ParticleEngine.CIRCLES
+        blits = []
+        for x, y, k, r, v, f in zip(position[:, 0].tolist(), position[:, 1].tolist(), kind[visible].tolist(),
+                                    radius[visible].tolist(), variant[visible].tolist(), frame[visible].tolist()):
+            if k == ParticleEngine.SPLATTER:
+                if r:
+                    blits.append((circles[r], (int(x) - r, int(y) - r)))
+            else:
+                poof = strip.frame(v, f)
+                blits.append((poof, (x - poof.get_width()//2, y - poof.get_height()//2)))
+        surface.blits(blits, doreturn=False)
+
+    def half_sizes(self):
+        # Smoke puffs start at 100 pixels across, splatters at 12
+        return numpy.where(self.kind[:self.count] == ParticleEngine.SPLATTER, 7, 51)
+
+    def visible(self, position):
+        """
+        :param position: The positions the particles are drawn at
+        :return: A boolean array of which particles overlap the viewport
+        """
+        half = self.half_sizes()
+        rect = Viewport.RECT
+        x = position[:, 0]
+        y = position[:, 1]
+        return (x + half > rect.left) & (x - half < rect.right) & (y + half > rect.top) & (y - half < rect.bottom)
+
+    def get_rect(self):
+        """
+        :return: The bounding box of every particle at its largest, or None if there aren't any
+        """
+        n = self.count
+        if not n:
+            return None
+        position = self.positions()
+        half = self.half_sizes()
+        left, top = (position - half[:, None]).min(axis=0)
+        right, bottom = (position + half[:, None]).max(axis=0)
+        return pygame.Rect(int(left) - 1, int(top) - 1, int(right - left) + 3, int(bottom - top) + 3)
+
+    def dirty_regions(self, offset=(0, 0)):
+        yield self, self.get_rect(), None
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,120 @@
+import constants as c
+from particle_engine import ParticleEngine
+from particle_pool import ParticlePool
+
+
+class ParticleLayer:
+    """
+    The particles drawn at one depth, kept under a budget.
+    Destroyed particles are removed in one pass after each update instead of one at a time.
+    """
+
+    def __init__(self, name, budget):
+        """
+        :param name: What the layer is called in stats
+        :param budget: The most particles the layer holds at once
+        """
+        self.name = name
+        self.budget = budget
+        self.particles = []
+        self.peak = 0
+        self.culled = 0
+
+    def __iter__(self):
+        return iter(self.particles)
+
+    def __len__(self):
+        return len(self.particles)
+
+    def add(self, particle):
+        """
+        Adds a particle, making room under the budget by culling the oldest particle of the lowest priority.
+        If everything already in the layer matters more than the new particle, the new one is dropped instead.
+        :return: Whether the particle was added
+        """
+        if len(self.particles) >= self.budget and not self.make_room(particle.priority):
+            self.culled += 1
+            ParticlePool.release(particle)
+            return False
+        self.particles.append(particle)
+        self.peak = max(self.peak, len(self.particles))
+        return True
+
+    def make_room(self, priority):
+        victim = None
+        for i, particle in enumerate(self.particles):
+            if particle.priority <= priority and (victim is None or particle.priority < self.particles[victim].priority):
+                victim = i
+                if particle.priority == 0:
+                    break
+        if victim is None:
+            return False
+        particle = self.particles.pop(victim)
+        particle.destroy()
+        ParticlePool.release(particle)
+        self.culled += 1
+        return True
+
+    def update(self, dt, events):
+        # Particles added while this runs wait until the next update, and ones culled to make room for them are skipped
+        for particle in list(self.particles):
+            if not particle.destroyed:
+                particle.update(dt, events)
+        self.compact()
+
+    def compact(self):
+        kept = []
+        for particle in self.particles:
+            if particle.destroyed:
+                ParticlePool.release(particle)
+            else:
+                kept.append(particle)
+        self.particles = kept
+
+    def clear(self):
+        for particle in self.particles:
+            ParticlePool.release(particle)
+        self.particles = []
+
+    def stats(self):
+        return {"current": len(self.particles), "peak": self.peak, "culled": self.culled, "budget": self.budget}
+
+
+class ParticleManager:
+    """
+    Every particle in a GameFrame: the layer behind the pot's front, the layer in front of everything,
+    and the batched engine for splatter and smoke when it's available.
+    """
+
+    def __init__(self, budgets=c.PARTICLE_BUDGETS):
+        """
+        :param budgets: The most particles each of "back", "front" and "batched" can hold at once
+        """
+        self.back = ParticleLayer("back", budgets["back"])
+        self.front = ParticleLayer("front", budgets["front"])
+        self.engine = None
+        if c.PARTICLE_ENGINE and ParticleEngine.available():
+            self.engine = ParticleEngine(budget=budgets["batched"])
+
+    def add(self, particle, front=False):
+        """
+        :param particle: The particle to add
+        :param front: Whether it draws in front of everything, rather than behind the pot's front
+        :return: Whether the particle was kept, rather than culled to stay under budget
+        """
+        if front:
+            return self.front.add(particle)
+        if self.engine is not None and self.engine.accepts(particle):
+            added = self.engine.adopt(particle)
+            ParticlePool.release(particle)
+            return added
+        return self.back.add(particle)
+
+    def stats(self):
+        """
+        :return: The current, peak and culled counts of each layer, by layer name
+        """
+        stats = {layer.name: layer.stats() for layer in (self.back, self.front)}
+        if self.engine is not None:
+            stats["batched"] = self.engine.stats()
+        return stats
@@ -0,0 +1,85 @@
+class ParticlePool:
+    """
+    Static free lists of expired particles, one per particle type, so the particles spawned by every drop,
+    splatter and poof are reused instead of allocated and thrown away.
+
+    Released particles only become available again after recycle() is called at the start of the next tick.
+    That way a particle is never reused during the tick it expired in, while the frame still remembers
+    where it was for interpolation.
+    """
+
+    MAX_FREE = 4096
+
+    free = {}
+    released = []
+    stats = {}
+
+    @staticmethod
+    def acquire(particle_type, *args, **kwargs):
+        """
+        Gets a particle of the given type, reusing an expired one if there is one.
+        :param particle_type: The Particle subclass to make
+        :return: A particle in the same state as particle_type(*args, **kwargs)
+        """
+        stats = ParticlePool.type_stats(particle_type)
+        free = ParticlePool.free.get(particle_type)
+        if free:
+            particle = free.pop()
+            particle.reset(*args, **kwargs)
+            stats["reused"] += 1
+        else:
+            particle = particle_type(*args, **kwargs)
+            stats["created"] += 1
+        particle.pooled = True
+        stats["live"] += 1
+        stats["high_water"] = max(stats["high_water"], stats["live"])
+        return particle
+
+    @staticmethod
+    def release(particle):
+        """
+        Hands back a particle that's no longer drawn or updated anywhere.
+        Particles that didn't come from the pool, or were already released, are ignored.
+        """
+        if not getattr(particle, "pooled", False):
+            return
+        particle.pooled = False
+        ParticlePool.type_stats(type(particle))["live"] -= 1
+        ParticlePool.released.append(particle)
+
+    @staticmethod
+    def recycle():
+        """
+        Makes everything released since the last call available to acquire.
+        """
+        for particle in ParticlePool.released:
+            free = ParticlePool.free.setdefault(type(particle), [])
+            if len(free) < ParticlePool.MAX_FREE:
+                free.append(particle)
+        ParticlePool.released = []
+
+    @staticmethod
+    def type_stats(particle_type):
+        if particle_type not in ParticlePool.stats:
+            ParticlePool.stats[particle_type] = {"created": 0, "reused": 0, "live": 0, "high_water": 0}
+        return ParticlePool.stats[particle_type]
+
+    @staticmethod
+    def report():
+        """
+        :return: Stats for each particle type by name, including how many are waiting in its free list
+        """
+        return {
+            particle_type.__name__: dict(stats, free=len(ParticlePool.free.get(particle_type, ())))
+            for particle_type, stats in ParticlePool.stats.items()
+        }
+
+    @staticmethod
+    def clear():
+        """
+        Forgets every pooled particle, for when the frame that owned them goes away.
+        """
+        ParticlePool.free = {}
+        ParticlePool.released = []
+        for stats in ParticlePool.stats.values():
+            stats["live"] = 0
@@ -1,7 +1,6 @@
 from ingredient import Ingredient
 from flavor_preview import FlavorPreview
 from image_manager import ImageManager
-import pygame
 
 import constants as c
 from particle import PanPoof
@@ -9,16 +8,20 @@ from sound_manager import SoundManager
 
 
 class Pot:
+
+    BACK_POSITION = (60, 410)
+    FRONT_POSITION = (60, 430)
+
     def __init__(self, frame):
         self.flavors = {key: 100/3 for key in c.FLAVORS}
         self.ingredient_count = 0
         self.preview = FlavorPreview(self.flavors, (350, 250),radius=180)
         self.frame = frame
 
-        self.bowl_front = ImageManager.load("assets/images/pan front.png")
-        self.bowl_front = pygame.transform.scale(self.bowl_front, (self.bowl_front.get_width() * c.WINDOW_WIDTH/1920 * 1.3, self.bowl_front.get_height() * c.WINDOW_HEIGHT/1280 * 1.3))
-        self.bowl_back = ImageManager.load("assets/images/pan back.png")
-        self.bowl_back = pygame.transform.scale(self.bowl_back, (self.bowl_back.get_width() * c.WINDOW_WIDTH/1920 * 1.3, self.bowl_back.get_height() * c.WINDOW_HEIGHT/1280 * 1.3))
+        width, height = ImageManager.size("assets/images/pan front.png")
+        self.bowl_front = ImageManager.load_scaled("assets/images/pan front.png", (width * c.WINDOW_WIDTH/1920 * 1.3, height * c.WINDOW_HEIGHT/1280 * 1.3))
+        width, height = ImageManager.size("assets/images/pan back.png")
+        self.bowl_back = ImageManager.load_scaled("assets/images/pan back.png", (width * c.WINDOW_WIDTH/1920 * 1.3, height * c.WINDOW_HEIGHT/1280 * 1.3))
 
         self.poof_noise = SoundManager.load("assets/sounds/order poof away.wav")
         self.poof_noise.set_volume(0.3)
@@ -46,11 +49,11 @@ class Pot:
         self.flavors = {key: 100 / 3 for key in c.FLAVORS}
         self.ingredient_count = 0
         self.preview.update_flavors(self.flavors)
-        for particle in self.frame.particles[:]:
+        for particle in list(self.frame.particles):
             if particle.food:
                 particle.destroy()
                 for i in range(10):
-                    self.frame.particles.append(PanPoof(particle.position.get_position(),color=128))
+                    self.frame.add_particle(PanPoof.create(particle.position.get_position(),color=128))
         self.frame.robot.pop_up()
         self.preview.clear_goal_vis()
         self.poof_noise.play()
@@ -58,11 +61,20 @@ class Pot:
     def update(self, dt, events):
         self.preview.update(dt, events)
 
+    def dirty_regions(self, offset=(0, 0)):
+        yield from self.preview.dirty_regions(offset)
+
+    def back_rect(self):
+        return self.bowl_back.get_rect(topleft=self.BACK_POSITION)
+
+    def front_rect(self):
+        return self.bowl_front.get_rect(topleft=self.FRONT_POSITION)
+
     def draw(self, surface, offset=(0, 0)):
         self.preview.draw(surface, offset)
 
-        surface.blit(self.bowl_back, (60 + offset[0], 410 + offset[1]))
+        surface.blit(self.bowl_back, (self.BACK_POSITION[0] + offset[0], self.BACK_POSITION[1] + offset[1]))
 
         self.frame.draw_particles(surface, offset)
 
-        surface.blit(self.bowl_front, (60 + offset[0], 430 + offset[1]))
\ No newline at end of file
+        surface.blit(self.bowl_front, (self.FRONT_POSITION[0] + offset[0], self.FRONT_POSITION[1] + offset[1]))
@@ -0,0 +1,171 @@
+import concurrent.futures
+import sys
+import time
+
+import pygame
+import yaml
+
+import constants as c
+from font_manager import FontManager
+from image_manager import ImageManager
+from sound_manager import SoundManager
+
+
+class Preloader:
+    """
+    Loads the assets listed in the preload manifest ahead of the frames that use them, so gameplay never waits
+    on a decode. Images and sounds are decoded on a pool of worker threads. update() hands the results to the
+    managers on the main thread, since converting a surface needs the display. Fonts are quick to open, so
+    they're opened there too. Anything that fails to load is logged and counted as done, and left for the
+    managers to load when it's first used.
+    """
+
+    MANIFEST_PATH = "assets/yaml/manifest.yaml"
+    MANIFEST = None
+
+    @staticmethod
+    def manifest():
+        """
+        :return: Each group's images, sounds and fonts, by group name
+        """
+        if Preloader.MANIFEST is None:
+            with open(Preloader.MANIFEST_PATH) as f:
+                Preloader.MANIFEST = yaml.safe_load(f.read())
+        return Preloader.MANIFEST
+
+    @staticmethod
+    def assets(*groups):
+        """
+        :return: Every ("image", path), ("sound", path) and ("font", (path, size)) in the groups, without repeats.
+            Images baked for this window size are ("baked", (path, chain)) for each of their baked copies instead.
+        """
+        assets = []
+        for group in groups:
+            entries = Preloader.manifest()[group]
+            for path in entries.get("images", ()):
+                if path in ImageManager.baked:
+                    assets += [("baked", (path, chain)) for chain in ImageManager.baked[path]["variants"]]
+                else:
+                    assets.append(("image", path))
+            assets += [("sound", path) for path in entries.get("sounds", ())]
+            assets += [("font", (path, size)) for path, size in entries.get("fonts", ())]
+        return list(dict.fromkeys(assets))
+
+    @staticmethod
+    def cached(kind, item):
+        if kind == "image":
+            return ImageManager.cached(item)
+        if kind == "baked":
+            return ImageManager.cached(*item)
+        if kind == "sound":
+            return item in SoundManager.sounds
+        return item in FontManager.fonts
+
+    @staticmethod
+    def decode(kind, path):
+        """
+        Runs on a worker thread, so it mustn't touch the managers.
+        :return: The decoded asset and how many seconds it took
+        """
+        started = time.perf_counter()
+        asset = pygame.mixer.Sound(path) if kind == "sound" else pygame.image.load(path)
+        return asset, time.perf_counter() - started
+
+    def __init__(self, workers=c.PRELOAD_WORKERS):
+        """
+        :param workers: How many threads decode at once
+        """
+        self.executor = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="preload")
+        self.in_flight = {}
+        self.failed = set()
+
+    def request(self, *groups, pin=False):
+        """
+        Starts loading every asset in the groups that isn't cached or on its way already.
+        :param pin: Pin the groups first, so their assets can't evict each other when they don't fit in the budget
+        """
+        if pin:
+            self.pin(*groups)
+        for kind, item in Preloader.assets(*groups):
+            if (kind, item) in self.in_flight or (kind, item) in self.failed or Preloader.cached(kind, item):
+                continue
+            if kind == "font":
+                self.in_flight[(kind, item)] = None
+            elif kind == "baked":
+                self.in_flight[(kind, item)] = self.executor.submit(Preloader.decode, kind, ImageManager.baked_file(*item))
+            else:
+                self.in_flight[(kind, item)] = self.executor.submit(Preloader.decode, kind, item)
+
+    def update(self, max_seconds=None):
+        """
+        Hands finished assets over to their managers. Call it on the main thread.
+        :param max_seconds: Stop handing over after this long, leaving the rest for the next call
+        """
+        started = time.perf_counter()
+        for (kind, item), future in list(self.in_flight.items()):
+            if max_seconds is not None and time.perf_counter() - started > max_seconds:
+                return
+            if future is not None and not future.done():
+                continue
+            try:
+                Preloader.hand_over(kind, item, future)
+            except (pygame.error, OSError) as error:
+                print(f"Couldn't preload {kind} {item}: {error}", file=sys.stderr)
+                self.failed.add((kind, item))
+                if kind == "baked":
+                    ImageManager.forget_baked(*item)
+            del self.in_flight[(kind, item)]
+
+    @staticmethod
+    def hand_over(kind, item, future):
+        """
+        Caches a loaded asset in its manager, raising whatever loading it raised.
+        :param future: The decode's future, or None for a font, which is opened here
+        """
+        if kind == "font":
+            FontManager.load(*item)
+        elif kind == "image":
+            ImageManager.add_decoded(item, *future.result())
+        elif kind == "baked":
+            path, chain = item
+            ImageManager.add_decoded(path, *future.result(), chain)
+        else:
+            SoundManager.add_loaded(item, *future.result())
+
+    def progress(self, *groups):
+        """
+        :return: The fraction of the groups' assets that are cached or failed to load, from 0 to 1
+        """
+        assets = Preloader.assets(*groups)
+        if not assets:
+            return 1
+        return sum(self.done(kind, item) for kind, item in assets)/len(assets)
+
+    def ready(self, *groups):
+        return all(self.done(kind, item) for kind, item in Preloader.assets(*groups))
+
+    def done(self, kind, item):
+        return (kind, item) in self.failed or Preloader.cached(kind, item)
+
+    def finish(self, *groups):
+        """
+        Loads and pins the groups right away, waiting for the workers.
+        """
+        self.request(*groups, pin=True)
+        concurrent.futures.wait([future for future in self.in_flight.values() if future])
+        self.update()
+
+    def pin(self, *groups):
+        """
+        Pins the groups' images and sounds, and unpins everything else, so the current frame's assets are never
+        evicted to stay under budget.
+        """
+        ImageManager.unpin_all()
+        SoundManager.unpin_all()
+        for kind, item in Preloader.assets(*groups):
+            if kind == "image":
+                ImageManager.pin(item)
+            elif kind == "baked":
+                ImageManager.pin(item[0])
+            elif kind == "sound":
+                SoundManager.pin(item)
@@ -92,6 +92,11 @@ class Pose:
     def copy(self):
         return Pose(self.get_position(), self.angle)
 
+    def interpolate(self, other, weight):
+        """ Return a new Pose weight of the way from this one to other """
+        return Pose((self.x + (other.x - self.x)*weight, self.y + (other.y - self.y)*weight),
+                    self.angle + (other.angle - self.angle)*weight)
+
     def scale_to(self, magnitude):
         """ Scale the X and Y components of the Pose to have a particular
             magnitude. Angle is unchanged.
@@ -9,6 +9,9 @@ import random
 import time
 
 from sound_manager import SoundManager
+from transform_cache import RotationCache, OpacityCache
+from glyph_atlas import GlyphAtlas
+from text_layout import TextLayout
 
 
 class Robot:
@@ -17,13 +20,11 @@ class Robot:
     POPPING_DOWN = 2
     DOWN = 3
 
-    SPEAK_FONT = None
-    CHARS = {}
+    SPEAK_GLYPHS = None
 
     def __init__(self, frame):
-        if not self.SPEAK_FONT:
-            Robot.SPEAK_FONT = pygame.font.Font("assets/fonts/a_goblin_appears.ttf", 16)
-            Robot.CHARS = {char: Robot.SPEAK_FONT.render(char, 1, (255, 255, 255)) for char in c.PRINTABLES}
+        if not self.SPEAK_GLYPHS:
+            Robot.SPEAK_GLYPHS = GlyphAtlas.get("assets/fonts/a_goblin_appears.ttf", 16, (255, 255, 255))
 
         self.frame = frame
         self.surf = ImageManager.load("assets/images/robot.png")
@@ -106,7 +107,7 @@ class Robot:
         self.target_position = self.up_position
         key = random.choice([key for key in Ingredient.ingredient_dict])
         self.frame.pot.add_ingredient(Ingredient.from_key(key))
-        particle = FoodParticle(key, self.frame)
+        particle = FoodParticle.create(key, self.frame)
         particle.position = self.position
         particle.velocity = Pose((500, 0))
         self.frame.add_particle(particle)
@@ -117,49 +118,36 @@ class Robot:
             pass
             #self.draw_dialog(surface, offset)
 
-        surf = pygame.transform.rotate(self.surf, self.position.angle*180/math.pi)
+        surf = RotationCache.rotate(self.surf, self.position.angle*180/math.pi)
         w = surf.get_width()
         h = surf.get_height()
         x = self.position.x + offset[0] - w//2
         y = self.position.y + offset[1] - h//2
         surface.blit(surf, (x, y))
 
+    def get_rect(self, offset=(0, 0)):
+        # Big enough for the surface at any rotation
+        size = math.ceil(max(self.surf.get_size()) * math.sqrt(2))
+        rect = pygame.Rect(0, 0, size, size)
+        rect.center = self.position.x + offset[0], self.position.y + offset[1]
+        return rect
+
+    def dirty_regions(self, offset=(0, 0)):
+        position = (int(self.position.x), int(self.position.y), round(self.position.angle, 3))
+        yield (self, "body"), self.get_rect(offset), position
+        if self.dialog_alpha > 0:
+            # The text wobbles every frame
+            yield (self, "dialog"), self.dialog.get_rect(), None
+
     def draw_dialog(self, surface, offset=(0, 0)):
         if self.dialog_alpha <= 0:
             return
-        self.dialog.set_alpha(self.dialog_alpha)
-        surface.blit(self.dialog, (0, 0))
+        OpacityCache.blit(surface, self.dialog, (0, 0), self.dialog_alpha)
 
         x = 20
         y = 40
         w = 200
         h = 100
         spacing = 30
-        words = self.dialog_text.split(" ")
-        lines = []
-        current_line = ""
-        line_width = 0
-        for word in words:
-            word_width = sum(Robot.CHARS[char].get_width() for char in word)
-            if line_width + word_width > w:
-                lines.append(current_line)
-                current_line = ""
-                line_width = 0
-
-            current_line += word + " "
-            line_width += word_width + Robot.CHARS[" "].get_width()
-        if current_line:
-            lines.append(current_line)
-
-        x0 = x
-        y0 = y + h / 2
-        y0 -= spacing * len(lines) / 2
-        for line in lines:
-            line_width = sum([Robot.CHARS[char].get_width() for char in line])
-            x = x0 - line_width // 2 + w // 2
-            for i, char in enumerate(line):
-                xp, yp = x, y0
-                yp += math.sin(time.time() * -32 + i * 2.6) * 1
-                surface.blit(Robot.CHARS[char], (xp, yp))
-                x += Robot.CHARS[char].get_width()
-            y0 += spacing
\ No newline at end of file
+        layout = TextLayout.get(self.dialog_text, Robot.SPEAK_GLYPHS, w, h, spacing)
+        layout.draw(surface, (x, y), time.time(), -32, 2.6)
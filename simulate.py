@@ -0,0 +1,46 @@
+import argparse
+import random
+
+import constants as c
+from game import Game
+from particle_pool import ParticlePool
+from viewport import Viewport
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Bot Appetit headless, as fast as the CPU allows.")
+    parser.add_argument("--frames", type=int, default=None, help="number of frames to simulate")
+    parser.add_argument("--seconds", type=float, default=None, help="wall-clock seconds to run for")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--dt", type=float, default=1/c.FRAMERATE, help="fixed timestep in seconds")
+    parser.add_argument("--no-render", dest="render", action="store_false", help="skip drawing entirely")
+    parser.add_argument("--dirty-rects", action="store_true", help="only redraw the parts of the screen that changed")
+    parser.add_argument("--profile", action="store_true", help="report per-phase frame times")
+    args = parser.parse_args()
+
+    if args.frames is None and args.seconds is None:
+        args.frames = 60 * c.FRAMERATE
+
+    random.seed(args.seed)
+    game = Game(headless=True, run=False, dirty_rects=args.dirty_rects)
+    game.frame_timer.enabled = args.profile
+    result = game.simulate(frames=args.frames, seconds=args.seconds, dt=args.dt, render=args.render)
+
+    if args.profile:
+        print(game.frame_timer.report())
+        for name, stats in ParticlePool.report().items():
+            print(f"{name:<20} " + "  ".join(f"{key} {value}" for key, value in stats.items()))
+        for name, stats in result["particles"].items():
+            print(f"{name + ' layer':<20} " + "  ".join(f"{key} {value}" for key, value in stats.items()))
+        for name, stats in Viewport.report().items():
+            print(f"{name:<20} drawn {stats['drawn']}  culled {stats['culled']}")
+        for name in ("images", "sounds"):
+            stats = result[name]
+            print(f"{name + ' cache':<20} " + "  ".join(f"{key} {stats[key]}" for key in
+                                                       ("entries", "bytes", "hits", "misses", "evictions")) +
+                  f"  load {sum(stats['load_times'].values()):.3f}s")
+    print(f"{result['frames']} frames in {result['seconds']:.2f}s: {result['fps']:.1f} frames per second")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
+import time
+
 import pygame
 
+import constants as c
+from asset_budget import AssetBudget
+
 
 class SoundManager:
     """
@@ -9,10 +14,14 @@ class SoundManager:
     initialized = False
     sounds = None
 
+    # Keeps sounds under c.SOUND_CACHE_BYTES
+    budget = None
+
     @staticmethod
     def init():
         SoundManager.initialized = True
         SoundManager.sounds = {}
+        SoundManager.budget = AssetBudget(c.SOUND_CACHE_BYTES)
 
     @staticmethod
     def check_initialized():
@@ -29,6 +38,7 @@ class SoundManager:
         SoundManager.check_initialized()
         if path in SoundManager.sounds:
             del SoundManager.sounds[path]
+        SoundManager.budget.remove(path)
 
     @staticmethod
     def clear_all():
@@ -37,6 +47,41 @@ class SoundManager:
         """
         SoundManager.check_initialized()
         SoundManager.sounds = {}
+        SoundManager.budget.clear()
+
+    @staticmethod
+    def pin(*paths):
+        """
+        Keeps sounds from being evicted to stay under budget.
+        :param paths: The paths of the sounds
+        """
+        SoundManager.check_initialized()
+        for path in paths:
+            SoundManager.budget.pin(path)
+
+    @staticmethod
+    def unpin(*paths):
+        SoundManager.check_initialized()
+        for path in paths:
+            SoundManager.budget.unpin(path)
+
+    @staticmethod
+    def unpin_all():
+        SoundManager.check_initialized()
+        SoundManager.budget.pinned.clear()
+
+    @staticmethod
+    def stats():
+        """
+        :return: Hits, misses, evictions, resident bytes and load time per path
+        """
+        SoundManager.check_initialized()
+        return SoundManager.budget.stats()
+
+    @staticmethod
+    def sound_bytes(sound):
+        frequency, size, channels = pygame.mixer.get_init()
+        return int(sound.get_length() * frequency) * channels * abs(size)//8
 
     @staticmethod
     def load(path):
@@ -47,7 +92,26 @@ class SoundManager:
         """
         SoundManager.check_initialized()
         if path in SoundManager.sounds:
+            SoundManager.budget.hit(path)
             return SoundManager.sounds[path]
+        started = time.perf_counter()
         sound = pygame.mixer.Sound(path)
+        return SoundManager.add_loaded(path, sound, time.perf_counter() - started)
+
+    @staticmethod
+    def add_loaded(path, sound, seconds=0):
+        """
+        Caches a sound that was loaded somewhere else, like on a preloading thread.
+        :param path: The path of the sound
+        :param sound: The loaded pygame.mixer.Sound
+        :param seconds: How long loading it took
+        :return: The cached sound, or the one already cached for path
+        """
+        SoundManager.check_initialized()
+        if path in SoundManager.sounds:
+            return SoundManager.sounds[path]
         SoundManager.sounds[path] = sound
+        SoundManager.budget.add(path, path, SoundManager.sound_bytes(sound), seconds)
+        for evicted in SoundManager.budget.evict():
+            del SoundManager.sounds[evicted]
         return sound
@@ -7,7 +7,11 @@ import time
 from flavor_preview import FlavorPreview
 from particle import FoodParticle
 from image_manager import ImageManager
+from font_manager import FontManager
 from sound_manager import SoundManager
+from glyph_atlas import GlyphAtlas
+from text_layout import TextLayout
+from transform_cache import ScaleCache, OpacityCache
 
 class SpiceRack:
 
@@ -71,6 +75,11 @@ class SpiceRack:
         for entry in self.entries:
             entry.draw(surface, offset=offset)
 
+    def dirty_regions(self, offset=(0, 0)):
+        offset = (0, 0)
+        for entry in self.entries:
+            yield from entry.dirty_regions(offset)
+
     def update_quantities(self):
         for entry in self.entries[:]:
             if not self.get_quantity(entry.key):
@@ -91,7 +100,7 @@ class SpiceRack:
 
     def add_to_pot(self, key):
         self.pot.add_ingredient(Ingredient.from_key(key))
-        self.pot.frame.add_particle(FoodParticle(key, self.pot.frame))
+        self.pot.frame.add_particle(FoodParticle.create(key, self.pot.frame))
         self.click_sound.play()
 
     def set_target_positions(self, snap=()):
@@ -122,10 +131,10 @@ class SpiceRack:
 class SpiceEntry:
 
     QUANTITY_FONT = None
-    DESCRIPTION_FONT = None
+    DESCRIPTION_GLYPHS = None
 
     def __init__(self, key, rack):
-        self.surface = pygame.transform.scale(Ingredient.get_surf(key), rack.LARGE_RECT)
+        self.surface = ImageManager.load_scaled(Ingredient.get_path(key), rack.LARGE_RECT)
         self.rack = rack
         self.key = key
         self.position = Pose((0, 0))
@@ -133,21 +142,22 @@ class SpiceEntry:
         self.scale = 0.5
         self.target_scale = 0.5
         if not SpiceEntry.QUANTITY_FONT:
-            SpiceEntry.QUANTITY_FONT = pygame.font.Font("assets/fonts/AllTheWayToTheSun.ttf", 25)
-        if not SpiceEntry.DESCRIPTION_FONT:
-            SpiceEntry.DESCRIPTION_FONT = pygame.font.Font("assets/fonts/corbel.ttf", 15)
+            SpiceEntry.QUANTITY_FONT = FontManager.load("assets/fonts/AllTheWayToTheSun.ttf", 25)
+        if not SpiceEntry.DESCRIPTION_GLYPHS:
+            SpiceEntry.DESCRIPTION_GLYPHS = GlyphAtlas.get("assets/fonts/corbel.ttf", 15, (255, 255, 255))
         self.squash = 0
-        self.surface = pygame.transform.scale(self.surface, self.rack.LARGE_RECT)
         self.preview = FlavorPreview(Ingredient.ingredient_dict[self.key]["flavors"],self.target_position.get_position(),radius=50)
         self.was_hovered = False
         self.hover_back = ImageManager.load("assets/images/item_hover.png")
-        self.hover_back.set_alpha(175)
 
         self.name_surf = SpiceEntry.QUANTITY_FONT.render(key.upper(), 1, (255, 255, 255))
-        self.description_chars = {char:SpiceEntry.DESCRIPTION_FONT.render(char, 1, (255, 255, 255)) for char in c.PRINTABLES}
 
         self.taste_icon = ImageManager.load(c.FLAVOR_ICONS[Ingredient.primary_flavor(self.key)])
 
+        self.dialog = Ingredient.ingredient_dict[self.key]["description"] if "description" in Ingredient.ingredient_dict[self.key]  else "unknown ingredient"
+        if self.dialog is None:
+            self.dialog = "unknown ingredient"
+
     def update(self, dt, events):
         self.position += (self.target_position - self.position)*dt*20
         if self.scale < self.target_scale:
@@ -201,7 +211,7 @@ class SpiceEntry:
         scale = (self.scale*0.5 + 0.5) * 0.2
         w = surf.get_width() * scale
         h = surf.get_height() * scale
-        surf = pygame.transform.scale(surf, (w, h))
+        surf = ScaleCache.scale(surf, (w, h))
         x = self.position.x + offset[0] - self.width()//2 + 5
         y = self.position.y + offset[1] + self.height()//2 - h
         surface.blit(surf, (x, y))
@@ -218,16 +228,43 @@ class SpiceEntry:
             return False
         return True
 
-    def draw(self, surface, offset=(0, 0)):
+    def squashed_size(self):
         w = self.width() * (1 - self.squash) + self.width() * self.squash * math.sin(self.squash * math.pi * 0.85) + 1
         h = (self.width() * self.height())/w
+        return w, h
+
+    def get_rect(self, offset=(0, 0)):
+        w, h = self.squashed_size()
+        rect = pygame.Rect(0, 0, math.ceil(w) + 2, math.ceil(h) + 2)
+        rect.center = self.position.x + offset[0], self.position.y + offset[1]
+        return rect
+
+    def get_preview_rect(self, offset=(0, 0)):
+        if self.preview.position.x == 0 or self.preview.position.y == 0:
+            return None
+        rect = self.hover_back.get_rect()
+        rect.center = self.preview.position.x + offset[0], self.preview.position.y + offset[1] - 30
+        rect.inflate_ip(20, 20)
+        preview_offset = (Pose(offset) + Pose((-70, -35))).get_position()
+        return rect.union(self.preview.get_rect(preview_offset))
+
+    def dirty_regions(self, offset=(0, 0)):
+        w, h = self.squashed_size()
+        position = (int(self.position.x), int(self.position.y), int(w), int(h), self.hovered())
+        yield (self, "body"), self.get_rect(offset), position
+        if self.hovered():
+            # The description wobbles every frame
+            yield (self, "preview"), self.get_preview_rect(offset), None
+
+    def draw(self, surface, offset=(0, 0)):
+        w, h = self.squashed_size()
         x = self.position.x + offset[0] - w//2
         y = self.position.y + offset[1] - h//2
 
         if self.hovered():
             self.draw_ingredient_preview(surface, offset=offset)
 
-        scaled = pygame.transform.scale(self.surface, (w, h))
+        scaled = ScaleCache.scale(self.surface, (w, h))
         surface.blit(scaled, (x, y))
         self.draw_quantity(surface, offset)
 
@@ -238,7 +275,7 @@ class SpiceEntry:
         h = self.hover_back.get_height()
         x = self.preview.position.x + offset[0] - w //2
         y = self.preview.position.y + offset[1] - h//2 - 30
-        surface.blit(self.hover_back, (x, y))
+        OpacityCache.blit(surface, self.hover_back, (x, y), 175)
 
         offset = (Pose(offset) + Pose((-70, -35))).get_position()
         self.preview.draw(surface, offset)
@@ -252,36 +289,7 @@ class SpiceEntry:
 
         offset = (Pose(offset) + self.preview.position + Pose((50, -30))).get_position()
 
-        self.dialog = Ingredient.ingredient_dict[self.key]["description"] if "description" in Ingredient.ingredient_dict[self.key]  else "unknown ingredient"
-        if self.dialog is None:
-            self.dialog = "unknown ingredient"
-        words = self.dialog.split(" ")
-        lines = []
-        current_line = ""
-        line_width = 0
-        for word in words:
-            word_width = sum(self.description_chars[char].get_width() for char in word)
-            if line_width + word_width > w:
-                lines.append(current_line)
-                current_line = ""
-                line_width = 0
-
-            current_line += word + " "
-            line_width += word_width + self.description_chars[" "].get_width()
-        if current_line:
-            lines.append(current_line)
-
-        x0 = offset[0]
-        y0 = offset[1] + height / 2 + 5
-        y0 -= spacing * len(lines) / 2
-        for line in lines:
-            line_width = sum([self.description_chars[char].get_width() for char in line])
-            x = x0 - line_width // 2 + w // 2
-            for i, char in enumerate(line):
-                xp, yp = x, y0
-                yp += math.sin(time.time() * -10 + i * 0.9) * 1
-                surface.blit(self.description_chars[char], (xp, yp))
-                x += self.description_chars[char].get_width()
-            y0 += spacing
+        layout = TextLayout.get(self.dialog, SpiceEntry.DESCRIPTION_GLYPHS, w, height, spacing)
+        layout.draw(surface, (offset[0], offset[1] + 5), time.time(), -10, 0.9)
 
         #pygame.draw.rect(surface, (255, 0, 0), (x, y, w, h), 2)
@@ -0,0 +1,160 @@
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import time
+
+import constants as c
+from customer_queue import Customer
+from frame import GameFrame
+from game import Game
+from ingredient import Ingredient
+from particle import FoodParticle, TintParticle
+
+SCENES = {}
+
+
+def scene(name):
+    """
+    Registers a stress scene. The decorated function takes a fresh GameFrame and a size,
+    pushes it into the worst case, and optionally returns a function that undoes any global changes.
+    """
+    def register(build):
+        SCENES[name] = build
+        return build
+    return register
+
+
+@scene("splatter")
+def food_landing(frame, size=200):
+    """ size FoodParticles that all land on the first frame, each spawning 20 SplatterParticles """
+    keys = list(Ingredient.ingredient_dict)
+    for i in range(size):
+        particle = FoodParticle.create(keys[i % len(keys)], frame)
+        particle.position.y = c.WINDOW_HEIGHT*0.6 - 1
+        frame.add_particle(particle)
+
+
+@scene("queue")
+def long_queue(frame, size=50):
+    """ size customers waiting in the CustomerQueue """
+    for i in range(size):
+        tolerance = random.random() * 0.5 + 0.3
+        customer = Customer((c.WINDOW_WIDTH + 100 + i*100, c.WINDOW_HEIGHT//2), frame.queue, tolerance)
+        frame.queue.customers.append(customer)
+
+
+@scene("rack")
+def huge_rack(frame, size=1000):
+    """ a SpiceRack holding size distinct ingredient keys, cloned from the real ones """
+    # Restored in place, since anything may be holding on to the dict itself
+    ingredient_dict = Ingredient.ingredient_dict
+    original = ingredient_dict.copy()
+
+    def restore():
+        ingredient_dict.clear()
+        ingredient_dict.update(original)
+
+    try:
+        keys = list(original)
+        for i in range(size - len(keys)):
+            key = keys[i % len(keys)]
+            ingredient_dict[f"{key} {i}"] = original[key]
+        frame.rack.add_ingredients({key: 3 for key in ingredient_dict})
+    except BaseException:
+        restore()
+        raise
+    return restore
+
+
+@scene("tints")
+def stacked_tints(frame, size=30):
+    """ size full-screen TintParticles stacked on top of each other """
+    for i in range(size):
+        frame.add_particle(TintParticle(duration=3600, color=(255, 0, 0), opacity=20), front=True)
+
+
+def resident_memory():
+    """
+    :return: The resident set size of this process in bytes, or the peak if the current value isn't available
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_scene(game, name, frames, size=None, dt=1/c.FRAMERATE, render=True):
+    """
+    Builds a scene on a fresh GameFrame and steps it headless.
+    :return: A dict with the build time and per-frame time and memory curves
+    """
+    random.seed(0)
+    frame = GameFrame(game)
+    frame.load()
+
+    start = time.perf_counter()
+    build = SCENES[name]
+    restore = build(frame) if size is None else build(frame, size)
+    build_time = time.perf_counter() - start
+
+    frame_times = []
+    memory = []
+    try:
+        for i in range(frames):
+            start = time.perf_counter()
+            frame.update(dt, [])
+            if render:
+                frame.draw(game.screen, (0, 0))
+            frame_times.append(time.perf_counter() - start)
+            memory.append(resident_memory())
+    finally:
+        if restore:
+            restore()
+
+    return {
+        "build_seconds": build_time,
+        "frame_seconds": frame_times,
+        "memory_bytes": memory,
+    }
+
+
+def summarize(name, result):
+    times = sorted(result["frame_seconds"])
+    memory = result["memory_bytes"]
+    p50 = times[len(times)//2] * 1000
+    p95 = times[min(len(times) - 1, len(times) * 95 // 100)] * 1000
+    return (f"{name:<10} build {result['build_seconds']*1000:8.1f}ms"
+            f"  frame p50 {p50:7.2f}ms  p95 {p95:7.2f}ms  max {times[-1]*1000:7.2f}ms"
+            f"  memory {memory[0]/2**20:6.1f} -> {max(memory)/2**20:6.1f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run worst-case scenes headless and report frame time and memory.")
+    parser.add_argument("scenes", nargs="*", help=f"scenes to run (default: all of {', '.join(SCENES)})")
+    parser.add_argument("--frames", type=int, default=300, help="frames to run each scene for")
+    parser.add_argument("--size", type=int, default=None, help="override the scene's default size")
+    parser.add_argument("--no-render", dest="render", action="store_false", help="skip drawing entirely")
+    parser.add_argument("--output", help="write the full frame time and memory curves here as JSON")
+    args = parser.parse_args()
+
+    game = Game(headless=True, run=False)
+    results = {}
+    for name in args.scenes or SCENES:
+        if name not in SCENES:
+            print(f"Unknown scene {name}", file=sys.stderr)
+            return 1
+        results[name] = run_scene(game, name, args.frames, size=args.size, render=args.render)
+        print(summarize(name, results[name]))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
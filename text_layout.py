@@ -0,0 +1,93 @@
+import collections
+import math
+
+from draw_list import DrawList
+
+
+class TextLayout:
+    """
+    Word-wrapped text centered in a box, with every glyph's position worked out once.
+    Layouts are cached by (text, glyphs, box), so drawing the same dialog every frame only pays for the blits.
+    """
+
+    CACHE = collections.OrderedDict()
+    MAX_CACHED = 64
+
+    @staticmethod
+    def get(text, glyphs, width, height, spacing):
+        """
+        Gets a layout from the cache, or lays the text out if it isn't there.
+        :param text: The text to lay out
+        :param glyphs: The GlyphAtlas to draw the characters from
+        :param width: The width to wrap lines at
+        :param height: The height of the box the lines are centered in
+        :param spacing: The distance between lines
+        """
+        key = (text, glyphs, width, height, spacing)
+        if key in TextLayout.CACHE:
+            TextLayout.CACHE.move_to_end(key)
+            return TextLayout.CACHE[key]
+        layout = TextLayout(text, glyphs, width, height, spacing)
+        TextLayout.CACHE[key] = layout
+        if len(TextLayout.CACHE) > TextLayout.MAX_CACHED:
+            TextLayout.CACHE.popitem(last=False)
+        return layout
+
+    def __init__(self, text, glyphs, width, height, spacing):
+        self.text = text
+        self.atlas = glyphs
+        self.lines = self.wrap(text, glyphs, width)
+
+        # (character, x, y, index in line) relative to the top left of the box
+        self.glyphs = []
+        y = height/2 - spacing*len(self.lines)/2
+        for line in self.lines:
+            line_width = sum([glyphs.width(char) for char in line])
+            x = width//2 - line_width//2
+            for i, char in enumerate(line):
+                if glyphs.width(char):
+                    self.glyphs.append((char, x, y, i))
+                x += glyphs.width(char)
+            y += spacing
+
+    @staticmethod
+    def wrap(text, glyphs, width):
+        words = text.split(" ")
+        lines = []
+        current_line = ""
+        line_width = 0
+        for word in words:
+            word_width = sum(glyphs.width(char) for char in word)
+            if line_width + word_width > width:
+                lines.append(current_line)
+                current_line = ""
+                line_width = 0
+
+            current_line += word + " "
+            line_width += word_width + glyphs.width(" ")
+        if current_line:
+            lines.append(current_line)
+        return lines
+
+    def draw(self, surface, position, t, speed, phase, amplitude=1):
+        """
+        Draws the text with each glyph bobbing on a sine wave.
+        :param position: The top left of the box
+        :param t: The time in seconds
+        :param speed: How fast the wave moves, in radians per second
+        :param phase: The phase difference between neighboring glyphs, in radians
+        """
+        x0, y0 = position
+        atlas = self.atlas
+        blits = []
+
+        def flush():
+            # The atlas is about to overwrite a cell that these may still need
+            surface.blits(blits, doreturn=False)
+            blits.clear()
+            DrawList.submit_pending(surface)
+
+        for char, x, y, i in self.glyphs:
+            glyph, area = atlas.glyph(char, flush)
+            blits.append((glyph, (x0 + x, y0 + y + math.sin(t*speed + i*phase)*amplitude), area))
+        surface.blits(blits, doreturn=False)
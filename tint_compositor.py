@@ -0,0 +1,72 @@
+import pygame
+
+import constants as c
+
+
+class TintCompositor:
+    """
+    Full-screen tints and fades. Tints added between flushes are merged into a single color and alpha,
+    so any number of stacked tints costs one blend, or a plain fill once together they're opaque.
+    """
+
+    # One screen-sized surface shared by every tint, refilled only when the color changes
+    SURFACE = None
+    SURFACE_COLOR = None
+
+    def __init__(self):
+        self.color = (0, 0, 0)
+        self.alpha = 0
+
+    def add(self, color, alpha):
+        """
+        Stacks a tint on top of the ones added since the last flush.
+        :param color: The tint's color
+        :param alpha: Its opacity, from 0 to 255
+        """
+        alpha = min(max(int(alpha), 0), 255)/255
+        if alpha <= 0:
+            return
+        total = alpha + self.alpha * (1 - alpha)
+        self.color = tuple((new * alpha + old * self.alpha * (1 - alpha))/total for new, old in zip(color, self.color))
+        self.alpha = total
+
+    def flush(self, surface):
+        """
+        Draws the merged tint, if there is one, and starts over.
+        """
+        if self.alpha > 0:
+            TintCompositor.blend(surface, [round(channel) for channel in self.color], round(self.alpha * 255))
+        self.color = (0, 0, 0)
+        self.alpha = 0
+
+    @staticmethod
+    def blend(surface, color, alpha, rect=None):
+        """
+        Draws one tint straight away.
+        :param color: The tint's color
+        :param alpha: Its opacity, from 0 to 255
+        :param rect: The part of the screen to tint, or None for all of it
+        """
+        alpha = min(int(alpha), 255)
+        if alpha <= 0:
+            return
+        rect = pygame.Rect(rect) if rect else pygame.Rect(0, 0, c.WINDOW_WIDTH, c.WINDOW_HEIGHT)
+        if alpha == 255:
+            surface.fill(color, rect)
+            return
+        tint = TintCompositor.shared_surface(color)
+        tint.set_alpha(alpha)
+        surface.blit(tint, rect.topleft, (0, 0, rect.w, rect.h))
+
+    @staticmethod
+    def shared_surface(color):
+        if not TintCompositor.SURFACE:
+            TintCompositor.SURFACE = pygame.Surface(c.WINDOW_SIZE)
+            if pygame.display.get_surface():
+                TintCompositor.SURFACE = TintCompositor.SURFACE.convert()
+            TintCompositor.SURFACE_COLOR = None
+        color = tuple(color)
+        if TintCompositor.SURFACE_COLOR != color:
+            TintCompositor.SURFACE.fill(color)
+            TintCompositor.SURFACE_COLOR = color
+        return TintCompositor.SURFACE
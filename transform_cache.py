@@ -0,0 +1,187 @@
+import collections
+import functools
+
+import pygame
+
+import constants as c
+from image_manager import ImageManager
+
+
+class SurfaceCache:
+    """
+    Static least recently used cache of transformed surfaces, bounded by the memory they take up.
+    Subclasses get their own entries and budget. Every entry is also charged to ImageManager's budget, so it's
+    dropped when that runs out or when the surface it was made from is evicted.
+    """
+
+    MAX_BYTES = 16 * 1024 * 1024
+
+    entries = collections.OrderedDict()
+    bytes = 0
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def fetch(cls, key, make):
+        """
+        Gets a surface from the cache, or makes and stores it if it isn't there.
+        :param key: A hashable tuple starting with the source surface
+        :param make: Called with no arguments to make the surface on a miss
+        :return: The cached surface, which is shared and shouldn't be modified
+        """
+        if key in cls.entries:
+            cls.entries.move_to_end(key)
+            ImageManager.touch((cls, key))
+            cls.hits += 1
+            return cls.entries[key]
+
+        cls.misses += 1
+        surface = make()
+        cls.entries[key] = surface
+        cls.bytes += cls.surface_bytes(surface)
+        ImageManager.charge((cls, key), key[0], surface, functools.partial(cls.discard, key))
+        while cls.bytes > cls.MAX_BYTES and len(cls.entries) > 1:
+            oldest = next(iter(cls.entries))
+            ImageManager.discharge((cls, oldest))
+            cls.discard(oldest)
+        return surface
+
+    @classmethod
+    def discard(cls, key):
+        """
+        Drops an entry, once ImageManager has stopped charging for it.
+        """
+        surface = cls.entries.pop(key, None)
+        if surface is not None:
+            cls.bytes -= cls.surface_bytes(surface)
+
+    @staticmethod
+    def surface_bytes(surface):
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    @classmethod
+    def clear(cls):
+        for key in list(cls.entries):
+            ImageManager.discharge((cls, key))
+        cls.entries.clear()
+        cls.bytes = 0
+
+    @classmethod
+    def stats(cls):
+        return {"entries": len(cls.entries), "bytes": cls.bytes, "hits": cls.hits, "misses": cls.misses}
+
+
+class RotationCache(SurfaceCache):
+    """
+    Rotated copies of sprites, with angles rounded to the nearest c.ROTATION_STEP degrees.
+    """
+
+    MAX_BYTES = c.ROTATION_CACHE_BYTES
+    STEP = c.ROTATION_STEP
+
+    entries = collections.OrderedDict()
+    bytes = 0
+    hits = 0
+    misses = 0
+
+    @staticmethod
+    def rotate(surface, degrees):
+        """
+        Drop-in replacement for pygame.transform.rotate.
+        :param surface: The surface to rotate
+        :param degrees: The angle to rotate counterclockwise by
+        :return: The rotated surface, or the original if the angle rounds to zero
+        """
+        step = RotationCache.STEP
+        bucket = round(degrees/step) % round(360/step)
+        if bucket == 0:
+            return surface
+        return RotationCache.fetch((surface, bucket), lambda: pygame.transform.rotate(surface, bucket * step))
+
+
+class ScaleCache(SurfaceCache):
+    """
+    Scaled copies of sprites, with sizes truncated to whole pixels like pygame.transform.scale does.
+    """
+
+    MAX_BYTES = c.SCALE_CACHE_BYTES
+
+    entries = collections.OrderedDict()
+    bytes = 0
+    hits = 0
+    misses = 0
+
+    @staticmethod
+    def scale(surface, size):
+        """
+        Drop-in replacement for pygame.transform.scale.
+        :param surface: The surface to scale
+        :param size: The (width, height) to scale to
+        :return: The scaled surface, or the original if it's already that size
+        """
+        size = int(size[0]), int(size[1])
+        if size == surface.get_size():
+            return surface
+        return ScaleCache.fetch((surface, size), lambda: pygame.transform.scale(surface, size))
+
+
+class OpacityCache(SurfaceCache):
+    """
+    Faded copies of sprites, so drawing at an opacity never changes the alpha of a shared surface.
+    Where pygame supports it, the copies are premultiplied and drawn with BLEND_PREMULTIPLIED, which is
+    cheaper than blending with surface alpha on every blit.
+    """
+
+    MAX_BYTES = c.OPACITY_CACHE_BYTES
+    LEVELS = c.OPACITY_LEVELS
+    PREMULTIPLIED = hasattr(pygame, "BLEND_PREMULTIPLIED")
+
+    entries = collections.OrderedDict()
+    bytes = 0
+    hits = 0
+    misses = 0
+
+    @staticmethod
+    def blit(destination, surface, position, opacity=255, area=None):
+        """
+        Draws surface at an opacity without touching its own alpha.
+        :param destination: The surface to draw on
+        :param surface: The surface to draw, which is left as it is
+        :param position: Where to draw it
+        :param opacity: From 0 for invisible to 255 for fully opaque, rounded to one of c.OPACITY_LEVELS steps
+        :param area: The part of surface to draw, or None for all of it
+        """
+        levels = OpacityCache.LEVELS
+        level = round(min(max(opacity, 0), 255) * levels/255)
+        if level == 0:
+            return
+        if not OpacityCache.PREMULTIPLIED:
+            if level == levels:
+                destination.blit(surface, position, area)
+                return
+            faded = OpacityCache.fetch((surface, level), lambda: OpacityCache.fade(surface, level * 255//levels))
+            destination.blit(faded, position, area)
+            return
+        faded = OpacityCache.fetch((surface, level), lambda: OpacityCache.premultiply(surface, level * 255//levels))
+        destination.blit(faded, position, area, special_flags=pygame.BLEND_PREMULTIPLIED)
+
+    @staticmethod
+    def with_alpha(surface):
+        if pygame.display.get_surface():
+            return surface.convert_alpha()
+        with_alpha = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
+        with_alpha.blit(surface, (0, 0))
+        return with_alpha
+
+    @staticmethod
+    def premultiply(surface, opacity):
+        premultiplied = OpacityCache.with_alpha(surface).premul_alpha()
+        if opacity < 255:
+            premultiplied.fill((opacity, opacity, opacity, opacity), special_flags=pygame.BLEND_RGBA_MULT)
+        return premultiplied
+
+    @staticmethod
+    def fade(surface, opacity):
+        faded = surface.copy()
+        faded.set_alpha(opacity)
+        return faded
@@ -0,0 +1,44 @@
+import pygame
+
+import constants as c
+
+
+class Viewport:
+    """
+    Static class for the part of the world that can end up on screen: the window plus c.CULL_MARGIN on
+    every side. Draws of anything entirely outside it are skipped, and counted by name.
+    """
+
+    RECT = pygame.Rect(-c.CULL_MARGIN, -c.CULL_MARGIN, c.WINDOW_WIDTH + 2*c.CULL_MARGIN, c.WINDOW_HEIGHT + 2*c.CULL_MARGIN)
+
+    drawn = {}
+    culled = {}
+
+    @staticmethod
+    def visible(rect, name=None):
+        """
+        :param rect: Where something would draw, or None if it doesn't know, which counts as visible
+        :param name: What to count the result under, if anything
+        :return: Whether any of rect is in the viewport
+        """
+        visible = rect is None or bool(Viewport.RECT.colliderect(rect))
+        if name:
+            Viewport.count(name, int(visible), int(not visible))
+        return visible
+
+    @staticmethod
+    def count(name, drawn, culled):
+        Viewport.drawn[name] = Viewport.drawn.get(name, 0) + drawn
+        Viewport.culled[name] = Viewport.culled.get(name, 0) + culled
+
+    @staticmethod
+    def report():
+        """
+        :return: How many draws of each kind were made and how many were culled since the last reset
+        """
+        return {name: {"drawn": Viewport.drawn[name], "culled": Viewport.culled[name]} for name in Viewport.drawn}
+
+    @staticmethod
+    def reset():
+        Viewport.drawn = {}
+        Viewport.culled = {}